@@ -0,0 +1,98 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+
+from rag.generation.gemini_client import GeminiUnavailableError
+from rag.generation.prompt import is_generated_answer
+from rag.registry import registry
+from config.settings_rag import rag_settings
+
+from .permissions import APIKeyAuthentication
+from .views import get_pipeline, retry_after_seconds
+
+
+def _authenticate(request):
+    """
+    Apply the API key check used by the DRF views.
+    Returns an error response, or None when the request is authenticated.
+    """
+    try:
+        if APIKeyAuthentication().authenticate(request) is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    return None
+
+
+# Async Query Endpoint
+@csrf_exempt
+@require_POST
+async def async_query_view(request):
+    """
+    Async variant of the query endpoint.
+    Served natively on the event loop by the ASGI application, so one
+    worker keeps many queries in flight while waiting on Qdrant and Gemini.
+    """
+    error = _authenticate(request)
+    if error is not None:
+        return error
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    question = str(data.get("question", "")).strip()
+
+    if not question:
+        return JsonResponse({"error": "Question is required"}, status=400)
+
+    # First call initializes the pipeline in a worker thread
+    pipeline = await sync_to_async(get_pipeline, thread_sensitive=False)()
+    answer_cache = registry.get("answer_cache") if rag_settings.ANSWER_CACHE_ENABLED else None
+
+    try:
+        query_embedding = await pipeline.retriever.aembed_query(question)
+        cached = answer_cache.lookup(query_embedding) if answer_cache else None
+
+        if cached is not None:
+            answer, retrieved_contexts = cached["answer"], cached["contexts"]
+            # Contexts cached by the sync views may not have their text loaded yet
+            await pipeline.retriever.aload_contexts(retrieved_contexts)
+        else:
+            answer, retrieved_contexts = await pipeline.agenerate_answer(
+                question, model="gemini", use_rag=True
+            )
+            # Placeholders and error messages are never cached
+            if answer_cache and retrieved_contexts and is_generated_answer(answer):
+                answer_cache.put(query_embedding, question, answer, retrieved_contexts)
+    except GeminiUnavailableError as e:
+        response = JsonResponse({"error": f"Generation unavailable: {str(e)}"}, status=503)
+        response["Retry-After"] = str(retry_after_seconds(e))
+        return response
+    except Exception as e:
+        return JsonResponse({"error": f"Generation failed: {str(e)}"}, status=500)
+
+    return JsonResponse(
+        {
+            "question": question,
+            "answer": answer,
+            "cached": cached is not None,
+            "retrieved_contexts": [
+                {
+                    "context": ctx.get("context", ""),
+                    "relevance_score": ctx.get("score", 0.0),
+                }
+                for ctx in retrieved_contexts
+            ],
+            "context_count": len(retrieved_contexts),
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
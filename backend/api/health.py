@@ -0,0 +1,115 @@
+import threading
+import time
+
+import google.generativeai as genai
+
+from rag.registry import registry
+from config.settings_rag import rag_settings
+
+
+class HealthMonitor:
+    """
+    Runs deep component checks on a background schedule and caches the
+    latest result, so probes never load models or open new clients.
+    """
+
+    def __init__(self, warmup=None, interval=rag_settings.HEALTH_CHECK_INTERVAL):
+        self.warmup = warmup
+        self.interval = interval
+        self.ready = False
+        self._result = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def ensure_started(self):
+        """Start the background checker once per process"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="health-monitor", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        # A transient failure at boot (Qdrant not up yet) must not leave the process not-ready
+        delay = 1.0
+        while self.warmup is not None and not self._stop.is_set():
+            try:
+                self.warmup()
+                break
+            except Exception as e:
+                self._store({"status": "unhealthy", "error": f"warmup failed: {str(e)}"})
+                print(f"Health monitor warmup failed, retrying in {delay:.0f}s: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.interval)
+
+        while not self._stop.is_set():
+            self.run_checks()
+            self._stop.wait(self.interval)
+
+    def run_checks(self):
+        """Check the components already loaded in this process"""
+        components = {}
+        healthy = True
+
+        # Qdrant check
+        collection_info = registry.get("vector_db").get_collection_info()
+        components["qdrant"] = collection_info
+        healthy &= collection_info.get("status") == "exists"
+
+        # Gemini check
+        if registry.is_loaded("gemini_model"):
+            try:
+                genai.get_model(f"models/{rag_settings.GEMINI_MODEL}")
+                components["gemini_api"] = "connected"
+            except Exception as e:
+                components["gemini_api"] = f"error: {str(e)}"
+                healthy = False
+        else:
+            components["gemini_api"] = "not loaded"
+
+        # Embedding model check
+        if registry.is_loaded("embedder"):
+            try:
+                registry.get("embedder").generate_single_embedding("health_check")
+                components["embedding_model"] = "ready"
+            except Exception as e:
+                components["embedding_model"] = f"error: {str(e)}"
+                healthy = False
+        else:
+            components["embedding_model"] = "not loaded"
+
+        # Cache statistics
+        if registry.is_loaded("query_cache"):
+            components["query_cache"] = registry.get("query_cache").stats()
+        if registry.is_loaded("answer_cache"):
+            components["answer_cache"] = registry.get("answer_cache").stats()
+        if registry.is_loaded("bm25_index"):
+            components["bm25_index"] = registry.get("bm25_index").stats()
+        if registry.is_loaded("gemini_client"):
+            components["gemini_client"] = registry.get("gemini_client").stats()
+
+        self.ready = healthy and registry.is_loaded("gemini_generator")
+        return self._store({
+            "status": "healthy" if healthy else "unhealthy",
+            "components": components,
+        })
+
+    def _store(self, result):
+        with self._lock:
+            self._result = result
+            self._checked_at = time.time()
+        return self.snapshot()
+
+    def snapshot(self):
+        """Latest cached result with its age in seconds"""
+        with self._lock:
+            if self._result is None:
+                return {"status": "starting", "age_seconds": None}
+            return {
+                **self._result,
+                "checked_at": self._checked_at,
+                "age_seconds": time.time() - self._checked_at,
+            }
@@ -0,0 +1,13 @@
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Accepts newline-delimited JSON uploads without consuming the body, so
+    the view can stream it line by line instead of buffering it.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return {}
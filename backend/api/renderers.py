@@ -0,0 +1,25 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients that send `Accept: text/event-stream` (e.g. EventSource)
+    pass content negotiation. Streaming responses bypass rendering; plain
+    responses such as validation errors are sent as a single event.
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return sse_event("error", data).encode(self.charset)
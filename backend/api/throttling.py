@@ -0,0 +1,13 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class DeepHealthCheckThrottle(SimpleRateThrottle):
+    """
+    Process-wide rate limit for on-demand deep health checks, shared by
+    all callers since the check itself is what needs protecting.
+    """
+
+    scope = "health_deep"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": "global"}
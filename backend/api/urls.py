@@ -1,8 +1,21 @@
 from django.urls import path
-from .views import health_check, query_view, ingest_view
+from .async_views import async_query_view
+from .views import (
+    health_check, liveness_check, deep_health_check,
+    query_view, query_stream_view, metrics_view, ingest_view,
+    bulk_ingest_view, ingest_job_view
+)
 
 urlpatterns = [
     path("health/", health_check, name="health"),
+    path("health/live/", liveness_check, name="health-live"),
+    path("health/ready/", health_check, name="health-ready"),
+    path("health/deep/", deep_health_check, name="health-deep"),
     path("query/", query_view, name="query"),
+    path("async/query/", async_query_view, name="async-query"),
+    path("query/stream/", query_stream_view, name="query-stream"),
+    path("metrics/", metrics_view, name="metrics"),
     path("ingest/", ingest_view, name="ingest"),
+    path("ingest/bulk/", bulk_ingest_view, name="ingest-bulk"),
+    path("ingest/jobs/<str:job_id>/", ingest_job_view, name="ingest-job"),
 ]
@@ -1,18 +1,32 @@
+import threading
 import time
-from rest_framework.decorators import api_view, permission_classes
+from functools import partial
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes, parser_classes
 from rest_framework.permissions import AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 
+from rag.generation.gemini_client import GeminiUnavailableError
+from rag.generation.prompt import is_generated_answer
+from rag.ingestion import make_document
+from rag.jobs.ingest_worker import IngestWorker
 from rag.pipeline import RAGPipeline
-from rag.embeddings.embeddings import EmbeddingGenerator
-from rag.vector_store.qdrant_store import VectorDB
-from rag.generation.models_loader import ModelLoader
-from qdrant_client.models import PointStruct
+from rag.registry import registry
+from rag.telemetry import telemetry
+from config.settings_rag import rag_settings
+
+from .health import HealthMonitor
+from .parsers import NDJSONParser
+from .renderers import EventStreamRenderer, sse_event
+from .throttling import DeepHealthCheckThrottle
 
 
 # Pipeline Singleton
 _pipeline = None
+_pipeline_lock = threading.Lock()
 
 def get_pipeline():
     """
@@ -20,49 +34,60 @@ def get_pipeline():
     """
     global _pipeline
     if _pipeline is None:
-        _pipeline = RAGPipeline()
-        _pipeline.initialize_pipeline()
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = RAGPipeline().initialize_pipeline()
     return _pipeline
 
 
-# Health Check
+# The monitor warms the pipeline up, then re-checks it in the background
+health_monitor = HealthMonitor(warmup=get_pipeline)
+
+# Drains bulk ingestion jobs, including ones queued before a restart
+ingest_worker = IngestWorker(warmup=get_pipeline)
+
+
+# Health Checks
+# Probes are exempt from throttling: load balancers poll them every few seconds
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def liveness_check(request):
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return Response({"status": "alive", "timestamp": time.time()})
+
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@throttle_classes([])
 def health_check(request):
     """
-    Health check endpoint for monitoring.
-    Checks Qdrant, Gemini API, and embedding model.
+    Readiness probe for monitoring.
+    Serves the cached result of the last background check of Qdrant,
+    the Gemini API and the embedding model.
     """
-    try:
-        # Qdrant check 
-        vector_db = VectorDB()
-        collection_info = vector_db.get_collection_info()
+    health_monitor.ensure_started()
+    ingest_worker.ensure_started()
+    result = health_monitor.snapshot()
 
-        # Gemini check 
-        try:
-            ModelLoader.load_gemini()
-            gemini_status = "connected"
-        except Exception as e:
-            gemini_status = f"error: {str(e)}"
+    return Response(
+        {**result, "ready": health_monitor.ready, "timestamp": time.time()},
+        status=status.HTTP_200_OK if health_monitor.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
 
-        # Embedding model check 
-        try:
-            embedding_gen = EmbeddingGenerator()
-            embedding_gen.generate_single_embedding("health_check")
-            embedding_status = "ready"
-        except Exception as e:
-            embedding_status = f"error: {str(e)}"
-
-        return Response({
-            "status": "healthy",
-            "components": {
-                "qdrant": collection_info,
-                "gemini_api": gemini_status,
-                "embedding_model": embedding_status,
-            },
-            "timestamp": time.time(),
-        })
 
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@throttle_classes([DeepHealthCheckThrottle])
+def deep_health_check(request):
+    """
+    Run the component checks now instead of serving the cached result.
+    """
+    health_monitor.ensure_started()
+    try:
+        result = health_monitor.run_checks()
     except Exception as e:
         return Response(
             {
@@ -72,6 +97,25 @@ def health_check(request):
             status=status.HTTP_503_SERVICE_UNAVAILABLE,
         )
 
+    return Response(
+        {**result, "ready": health_monitor.ready, "timestamp": time.time()},
+        status=status.HTTP_200_OK if result["status"] == "healthy" else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+def retry_after_seconds(error):
+    """Retry-After value for a GeminiUnavailableError"""
+    return max(1, int(round(error.retry_after or rag_settings.GEMINI_RETRY_BASE_DELAY)))
+
+
+def unavailable_response(error):
+    response = Response(
+        {"error": f"Generation unavailable: {str(error)}"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = str(retry_after_seconds(error))
+    return response
+
+
 # Query Endpoint
 @api_view(["POST"])
 def query_view(request):
@@ -87,9 +131,21 @@ def query_view(request):
         )
 
     pipeline = get_pipeline()
+    answer_cache = registry.get("answer_cache") if rag_settings.ANSWER_CACHE_ENABLED else None
 
     try:
-        answer, retrieved_contexts = pipeline.gemini_generator.generate_with_rag(question)
+        query_embedding = pipeline.retriever.embed_query(question)
+        cached = answer_cache.lookup(query_embedding) if answer_cache else None
+
+        if cached is not None:
+            answer, retrieved_contexts = cached["answer"], cached["contexts"]
+        else:
+            answer, retrieved_contexts = pipeline.gemini_generator.generate_with_rag(question)
+            # Placeholders and error messages are never cached
+            if answer_cache and retrieved_contexts and is_generated_answer(answer):
+                answer_cache.put(query_embedding, question, answer, retrieved_contexts)
+    except GeminiUnavailableError as e:
+        return unavailable_response(e)
     except Exception as e:
         return Response(
             {"error": f"Generation failed: {str(e)}"},
@@ -99,6 +155,7 @@ def query_view(request):
     return Response({
         "question": question,
         "answer": answer,
+        "cached": cached is not None,
         "retrieved_contexts": [
             {
                 "context": ctx.get("context", ""),
@@ -110,14 +167,103 @@ def query_view(request):
     })
 
 
+# Streaming Query Endpoint
+@api_view(["GET", "POST"])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def query_stream_view(request):
+    """
+    Stream a generated answer as server-sent events.
+    Sends a `contexts` event first, then `token` events as the answer is
+    generated, and a final `done` event with the full answer.
+    """
+    question = (request.data.get("question") or request.query_params.get("question", "")).strip()
+    model = (request.data.get("model") or request.query_params.get("model", "gemini")).lower()
+
+    if not question:
+        return Response(
+            {"error": "Question is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if model not in ("gemini", "gpt2"):
+        return Response(
+            {"error": f"Unsupported model: {model}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    pipeline = get_pipeline()
+    generator = pipeline.gemini_generator if model == "gemini" else pipeline.gpt2_generator
+    started = time.perf_counter()
+
+    def event_stream():
+        ttft = None
+        events = generator.stream_with_rag(question)
+        try:
+            for event in events:
+                if event["event"] == "contexts":
+                    data = [
+                        {
+                            "context": ctx.get("context", ""),
+                            "relevance_score": ctx.get("score", 0.0),
+                        }
+                        for ctx in event["data"]
+                    ]
+                elif event["event"] == "token":
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                        telemetry.observe(f"query_stream.{model}.ttft_seconds", ttft)
+                    data = {"text": event["data"]}
+                else:
+                    data = {**event["data"], "ttft_seconds": ttft}
+
+                yield sse_event(event["event"], data)
+        except Exception as e:
+            yield sse_event("error", {"error": f"Generation failed: {str(e)}"})
+        finally:
+            # Django closes this generator on disconnect; pass that on to the upstream stream
+            events.close()
+
+        telemetry.observe(f"query_stream.{model}.total_seconds", time.perf_counter() - started)
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# Metrics Endpoint
+@api_view(["GET"])
+def metrics_view(request):
+    """
+    Latency and cache metrics collected in this process.
+    """
+    caches = {
+        name: registry.get(name).stats()
+        for name in ("query_cache", "answer_cache")
+        if registry.is_loaded(name)
+    }
+
+    return Response({
+        "histograms": telemetry.snapshot(),
+        "caches": caches,
+        "timestamp": time.time(),
+    })
+
+
 # Ingestion Endpoint
 @api_view(["POST"])
 def ingest_view(request):
     """
     Ingest new text into the vector database.
+    Long texts are split into overlapping sentence-aware chunks. Concurrent
+    requests are coalesced into batched writes; unless `sync` is set (or
+    INGEST_SYNC_DURABILITY is on) the response is sent once the document
+    is buffered, before it is written; the buffer is flushed on graceful
+    shutdown but lost if the process is killed.
     """
     text = request.data.get("text", "").strip()
     metadata = request.data.get("metadata", {})
+    sync = str(request.data.get("sync", rag_settings.INGEST_SYNC_DURABILITY)).lower() in ("true", "1")
 
     if not text:
         return Response(
@@ -125,29 +271,96 @@ def ingest_view(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    embedding_generator = EmbeddingGenerator()
-    embedding = embedding_generator.generate_single_embedding(text)
+    # Rejected up front: a buffered document has already been answered with 202
+    try:
+        registry.get("ingestor").validate(text)
+    except ValueError as e:
+        return Response(
+            {"error": f"Nothing to ingest: {str(e)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    vector_db = VectorDB()
-    document_id = int(time.time() * 1000)
+    document = make_document(text, metadata)
+    future = registry.get("ingest_buffer").submit(document)
 
-    point = PointStruct(
-        id=document_id,
-        vector=embedding.tolist(),
-        payload={
-            "context": text,
-            "metadata": metadata,
-            "ingested_at": time.time(),
-        },
-    )
+    if not sync:
+        future.add_done_callback(partial(_report_ingest_failure, document["id"]))
+        return Response(
+            {"status": "accepted", "document_id": document["id"]},
+            status=status.HTTP_202_ACCEPTED,
+        )
 
-    vector_db.client.upsert(
-        collection_name=vector_db.collection_name,
-        points=[point],
-        wait=True,
-    )
+    try:
+        result = future.result()
+    except Exception as e:
+        return Response(
+            {"error": f"Ingestion failed: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
 
     return Response({
         "status": "success",
-        "document_id": document_id,
-    })
\ No newline at end of file
+        "document_id": result["document_id"],
+        "chunks": result["chunks"],
+    })
+
+
+def _report_ingest_failure(document_id, future):
+    """Log and count write-behind failures that no request is waiting for"""
+    if future.exception() is not None:
+        telemetry.observe("ingest_buffer.failures", 1)
+        print(f"Buffered ingest of {document_id} failed: {future.exception()}")
+
+
+# Bulk Ingestion Endpoints
+@api_view(["POST"])
+@parser_classes([NDJSONParser, MultiPartParser])
+def bulk_ingest_view(request):
+    """
+    Queue a bulk ingestion job.
+    Accepts an NDJSON body (application/x-ndjson) or a multipart upload
+    with an NDJSON `file`; each line is {"text": ..., "metadata": {...}}
+    with an optional "id". Returns immediately with the job ID.
+    """
+    if request.content_type.startswith("multipart/"):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "A 'file' upload is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        lines = upload
+    else:
+        lines = request._request
+
+    job_id = registry.get("ingest_queue").create_job(lines)
+    job = registry.get("ingest_queue").status(job_id)
+    if job["total"] == 0:
+        return Response(
+            {"error": "No records in upload", "job_id": job_id},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    ingest_worker.notify()
+
+    return Response(
+        {
+            "status": "queued",
+            "job_id": job_id,
+            "records": job["total"],
+            "status_url": f"/api/ingest/jobs/{job_id}/",
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+@api_view(["GET"])
+def ingest_job_view(request, job_id):
+    """
+    Progress, throughput and per-record errors of a bulk ingestion job.
+    """
+    ingest_worker.ensure_started()
+    job = registry.get("ingest_queue").status(job_id)
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
@@ -1,3 +1,9 @@
+"""
+ASGI entry point. Run it with an ASGI server, e.g.
+`uvicorn backend.config.asgi:application`, so that the async views
+(/api/async/query/) run natively on the event loop; sync DRF views are
+still served from Django's thread pool.
+"""
 import os
 from django.core.asgi import get_asgi_application
 
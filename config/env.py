@@ -5,6 +5,7 @@ load_dotenv()
 
 # Secrets
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. a local fake server in tests
 DJANGO_SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
 
 # Environment
@@ -15,6 +16,16 @@ DJANGO_ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS").split(",")
 QDRANT_HOST = os.getenv("QDRANT_HOST")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT"))
 COLLECTION_NAME = os.getenv("COLLECTION_NAME")
+REBUILD_INDEX = os.getenv("REBUILD_INDEX", "False").lower() == "true"
+
+# Vector store
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant")
+EMBEDDED_STORE_DIR = os.getenv("EMBEDDED_STORE_DIR", ".cache/vector_store")
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", ".cache/documents")
+INGEST_QUEUE_PATH = os.getenv("INGEST_QUEUE_PATH", ".cache/ingest_jobs.sqlite3")
+
+# Caches
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
 
 
 # API Security
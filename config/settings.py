@@ -101,6 +101,7 @@ REST_FRAMEWORK = {
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
         'user': '1000/day',
+        'health_deep': '6/min',
     }
 }
 
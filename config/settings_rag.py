@@ -1,4 +1,4 @@
-from .env import GOOGLE_API_KEY, QDRANT_HOST, QDRANT_PORT,COLLECTION_NAME
+from .env import GOOGLE_API_KEY, GEMINI_API_ENDPOINT, QDRANT_HOST, QDRANT_PORT,COLLECTION_NAME, REBUILD_INDEX, EMBEDDING_CACHE_DIR, VECTOR_STORE, EMBEDDED_STORE_DIR, DOCUMENT_STORE_DIR, INGEST_QUEUE_PATH
 
 class RAGSettings:
     # Models 
@@ -6,16 +6,92 @@ class RAGSettings:
     GPT2_MODEL = "aubmindlab/aragpt2-medium"
     GEMINI_MODEL = "gemini-2.5-flash"
 
+    # Embedding backend 
+    EMBEDDING_BACKEND = "torch"  # "torch" | "onnx" | "int8"
+    EMBEDDING_PARITY_SAMPLE_SIZE = 64
+    EMBEDDING_PARITY_MIN_COSINE = 0.99
+
+    # Vector store 
+    VECTOR_STORE = VECTOR_STORE  # "qdrant" | "embedded"
+    EMBEDDED_STORE_DIR = EMBEDDED_STORE_DIR
+    EMBEDDED_INDEX = "exact"  # "exact" | "ivf"
+    EMBEDDED_IVF_NLIST = 64
+    EMBEDDED_IVF_NPROBE = 8
+
     # Qdrant 
     QDRANT_HOST = QDRANT_HOST
     QDRANT_PORT = QDRANT_PORT
     COLLECTION_NAME = COLLECTION_NAME
+    REBUILD_INDEX = REBUILD_INDEX
+    UPSERT_BATCH_SIZE = 256
+    UPSERT_PARALLEL = 4
+    UPSERT_MAX_RETRIES = 3
+
+    # Qdrant index 
+    QDRANT_HNSW_M = 16
+    QDRANT_HNSW_EF_CONSTRUCT = 100
+    QDRANT_SEARCH_EF = 128
+    QDRANT_QUANTIZATION = None  # None | "int8" | "binary"
+    QDRANT_QUANTIZATION_OVERSAMPLING = 2.0
+    QDRANT_QUANTIZATION_RESCORE = True
+    QDRANT_ON_DISK = False
+
+    # Document store 
+    DOCUMENT_STORE_DIR = DOCUMENT_STORE_DIR
+    # Payload fields kept in Qdrant for filtering and deduplication; everything else lives in the document store
+    QDRANT_PAYLOAD_FIELDS = ("split", "parent_id", "chunk_index", "text_hash", "ingested_at")
+
+    # Embedding cache 
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_DIR = EMBEDDING_CACHE_DIR
+    EMBEDDING_CACHE_MAX_SEGMENTS = 64
+
+    # Text cleaning 
+    TEXT_CLEANING_WORKERS = 4
+    TEXT_CLEANING_PARALLEL_MIN_CHARS = 8 * 1024 * 1024
+
+    # Ingestion 
+    CHUNK_SIZE = 1000  # characters
+    CHUNK_OVERLAP = 200  # characters, whole sentences only
+    MERGE_ADJACENT_CHUNKS = True
+    INGEST_NORMALIZE_TEXT = True
+
+    # Single-document ingest buffer 
+    INGEST_BUFFER_MAX_DOCUMENTS = 32
+    INGEST_BUFFER_MAX_WAIT_MS = 200
+    INGEST_SYNC_DURABILITY = False  # wait for the flush before responding
+
+    # Bulk ingestion 
+    INGEST_QUEUE_PATH = INGEST_QUEUE_PATH
+    INGEST_BATCH_SIZE = 64  # records per encode + upsert
+    INGEST_POLL_INTERVAL = 2.0
+    INGEST_JOB_STALE_SECONDS = 300
+    INGEST_JOB_MAX_ATTEMPTS = 8  # infrastructure failures before a job is failed
+    INGEST_RETRY_BASE_DELAY = 5.0
+    INGEST_RETRY_MAX_DELAY = 300.0
+    INGEST_MAX_REPORTED_ERRORS = 100
 
     # Retrieval 
     TOP_K_RETRIEVAL = 5
     TOP_K_EVALUATION = 3
+    RETRIEVAL_BATCH_SIZE = 64
     SIMILARITY_THRESHOLD_EVALUATION = 0.60
     SIMILARITY_THRESHOLD = 0.3
+    QUERY_CACHE_MAX_ENTRIES = 10000
+    QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+    # Hybrid retrieval 
+    HYBRID_RETRIEVAL = True
+    RRF_K = 60
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    # Points ingested by other processes are picked up at most this often (seconds)
+    BM25_REFRESH_INTERVAL = 10
+    # Re-scan window for points whose ingest started before the previous refresh but landed after it
+    BM25_REFRESH_OVERLAP = 120
+
+    # Async query path 
+    MODEL_EXECUTOR_WORKERS = 4
 
     # GPT2 
     TOP_K_GENERATION=1
@@ -24,19 +100,50 @@ class RAGSettings:
     GPT2_TOP_P = 0.8
     GPT2_NUM_BEAMS = 8
     GPT2_NO_REPEAT_NGRAM_SIZE = 3
+    GPT2_BATCHING_ENABLED = True
+    GPT2_BACKEND = "pytorch"  # "pytorch" | "int8" | "onnx"
+    GPT2_ONNX_DIR = ".cache/onnx/aragpt2-medium"
+    GPT2_PARITY_CHECK = True
+    GPT2_PARITY_MIN_AGREEMENT = 0.9
+    GPT2_MAX_BATCH_SIZE = 8
+    GPT2_BATCH_WAIT_MS = 20
 
     # Gemini 
     GEMINI_MAX_TOKENS = 1024
     GEMINI_TEMPERATURE = 0.1
     GEMINI_TOP_P = 0.9
 
+    # Gemini client 
+    GEMINI_RATE_LIMIT = 5.0  # requests per second
+    GEMINI_BURST = 10
+    GEMINI_INITIAL_CONCURRENCY = 4
+    GEMINI_MIN_CONCURRENCY = 1
+    GEMINI_MAX_CONCURRENCY = 32
+    GEMINI_LATENCY_TARGET = 10.0  # seconds; slower calls shrink the concurrency limit
+    GEMINI_TIMEOUT = 60.0  # per-call deadline covering waits and retries
+    GEMINI_MAX_RETRIES = 4
+    GEMINI_RETRY_BASE_DELAY = 1.0
+    GEMINI_RETRY_MAX_DELAY = 20.0
+    GEMINI_BREAKER_FAILURES = 5  # consecutive upstream failures before failing fast
+    GEMINI_BREAKER_RESET_SECONDS = 30
+
+    # Answer cache 
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+    ANSWER_CACHE_TTL = 3600  # also bounds staleness across workers: invalidation is per process
+    ANSWER_CACHE_MAX_ENTRIES = 1024
+
     # Evaluation 
     EVAL_SUBSET_SIZE = 50
-    MAX_RETRIES = 5
-    BASE_DELAY = 10
+    EVAL_RESULTS_PATH = ".cache/eval/generation_predictions.jsonl"
+    EVAL_CONCURRENCY = {"gpt2": GPT2_MAX_BATCH_SIZE, "gemini": 4}  # questions in flight per backend
+
+    # Health checks 
+    HEALTH_CHECK_INTERVAL = 30
 
     # API 
     GOOGLE_API_KEY = GOOGLE_API_KEY
+    GEMINI_API_ENDPOINT = GEMINI_API_ENDPOINT
 
 
 rag_settings = RAGSettings()
@@ -1,9 +1,6 @@
 import gradio as gr
-import time
 from rag.pipeline import RAGPipeline
-from rag.embeddings.embeddings import EmbeddingGenerator
-from rag.vector_store.qdrant_store import VectorDB
-from qdrant_client.models import PointStruct
+from rag.registry import registry
 
 # Pipeline singleton
 pipeline = None
@@ -20,29 +17,10 @@ def ingest_text(text, metadata=None):
     if not text.strip():
         return "Text is required"
 
-    embedding_gen = EmbeddingGenerator()
-    embedding = embedding_gen.generate_single_embedding(text)
-
-    vector_db = VectorDB()
-    document_id = int(time.time() * 1000)
-
-    point = PointStruct(
-        id=document_id,
-        vector=embedding.tolist(),
-        payload={
-            "context": text,
-            "metadata": metadata or {},
-            "ingested_at": time.time(),
-        }
-    )
-
-    vector_db.client.upsert(
-        collection_name=vector_db.collection_name,
-        points=[point],
-        wait=True
-    )
-
-    return f"Text ingested successfully with ID: {document_id}"
+    result = registry.get("ingestor").ingest(text, metadata)
+
+    return (f"Text ingested successfully with ID: {result['document_id']} "
+            f"({result['chunks']} chunks)")
 
 # Ask question (Gemini + RAG only)
 def ask_question(question):
@@ -1,10 +1,19 @@
+import inspect
+import json
+import os
+import threading
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import numpy as np
 from evaluate import load
 
 from rag.data.text_cleaning import normalize_arabic
-from rag.embeddings.embeddings import EmbeddingGenerator
+from rag.generation import prompt
+from rag.generation.prompt import is_generated_answer
+from rag.registry import registry
+from rag.vector_store.base import content_hash
+from rag.telemetry import telemetry
 from config.settings_rag import rag_settings
 
 from evaluation.metrics import (
@@ -14,40 +23,181 @@ from evaluation.metrics import (
     semantic_similarity
 )
 
+
+# Settings that change what the generators produce
+FINGERPRINT_SETTINGS = [
+    "GPT2_MODEL", "GPT2_BACKEND", "GPT2_MAX_TOKENS", "GPT2_TEMPERATURE", "GPT2_TOP_P",
+    "GPT2_NUM_BEAMS", "GPT2_NO_REPEAT_NGRAM_SIZE",
+    "GEMINI_MODEL", "GEMINI_MAX_TOKENS", "GEMINI_TEMPERATURE", "GEMINI_TOP_P",
+    "EMBEDDING_MODEL", "EMBEDDING_BACKEND", "VECTOR_STORE", "COLLECTION_NAME",
+    "TOP_K_RETRIEVAL", "SIMILARITY_THRESHOLD", "HYBRID_RETRIEVAL", "RRF_K",
+    "CHUNK_SIZE", "CHUNK_OVERLAP", "MERGE_ADJACENT_CHUNKS",
+]
+
+
+def backend_of(name):
+    """Backend of a generator named like "gpt2_rag" or "gemini_no_rag\""""
+    return name.split("_", 1)[0]
+
+
+def run_fingerprint(questions, refs):
+    """Hash of the generation settings, the prompt template and the evaluated rows"""
+    settings = {name: getattr(rag_settings, name) for name in FINGERPRINT_SETTINGS}
+    dataset = content_hash(*(f"{qid}\x1e{question}\x1e{ref}" for (qid, question), ref in zip(questions, refs)))
+    return content_hash(
+        json.dumps(settings, sort_keys=True, default=str),
+        inspect.getsource(prompt),
+        dataset
+    )[:16]
+
+
 class GenerationEvaluator:
-    def __init__(self):
-        self.embedder = EmbeddingGenerator()
+    """
+    Runs every generator concurrently, each with a per-backend number of
+    questions in flight. GPT-2 prompts are coalesced by the generator's
+    batcher and Gemini calls are paced by the shared Gemini client.
+
+    Each prediction is appended to a JSONL checkpoint as soon as it is
+    made, so an interrupted run resumes with the questions still missing.
+    Records carry a fingerprint of the settings, prompt and dataset; those
+    from a different configuration are ignored rather than scored.
+    """
+
+    def __init__(self, results_path=rag_settings.EVAL_RESULTS_PATH):
+        self.embedder = registry.get("embedder")
         self.bleu_metric = load("bleu")
+        self.results_path = results_path
+        self._write_lock = threading.Lock()
 
     def safe_generate(self, generate_func, question):
-        for attempt in range(rag_settings.MAX_RETRIES):
-            try:
-                return normalize_arabic(generate_func(question))
-            except Exception as e:
-                delay = rag_settings.BASE_DELAY * (2 ** attempt)
-                time.sleep(delay + random.uniform(0, 2))
-        return "ERROR"
-
-    def evaluate(self, df_val, generators_dict):
+        """Normalized prediction, or None when generation failed or produced no answer"""
+        # Rate limiting and retries happen in the Gemini client
+        try:
+            answer = generate_func(question)
+        except Exception as e:
+            print(f"Generation failed: {str(e)}")
+            return None
+
+        # Checked before normalization, which strips the Latin placeholders
+        if not is_generated_answer(answer):
+            print(f"No answer generated: {answer}")
+            return None
+        return normalize_arabic(answer)
+
+    def load_checkpoint(self, fingerprint):
+        """Predictions recorded by earlier runs of this configuration, keyed by (generator, question id)"""
+        done = {}
+        if not os.path.exists(self.results_path):
+            return done
+
+        ignored = 0
+
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line of an interrupted run
+                    continue
+                if record.get("fingerprint") != fingerprint:
+                    ignored += 1
+                    continue
+                done[(record["generator"], record["id"])] = record["prediction"]
+
+        if ignored:
+            print(f"Ignoring {ignored} checkpointed predictions from a different "
+                  f"configuration in {self.results_path}")
+        return done
+
+    def _checkpoint(self, f, record):
+        with self._write_lock:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+    def _timed_generate(self, name, generate_func, question):
+        started = time.perf_counter()
+        prediction = self.safe_generate(generate_func, question)
+        seconds = time.perf_counter() - started
+        telemetry.observe(f"eval.{name}.seconds", seconds)
+        return prediction, seconds
+
+    def run_generator(self, name, generate_func, questions, done, f, fingerprint):
+        """Generate the predictions still missing for one generator; returns its timings"""
+        pending = [(qid, question) for qid, question in questions if (name, qid) not in done]
+        workers = rag_settings.EVAL_CONCURRENCY.get(backend_of(name), 1)
+        started = time.perf_counter()
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"eval-{name}") as pool:
+            futures = {
+                pool.submit(self._timed_generate, name, generate_func, question): (qid, question)
+                for qid, question in pending
+            }
+            for future in as_completed(futures):
+                qid, question = futures[future]
+                prediction, seconds = future.result()
+
+                # Failures are not checkpointed, so a resumed run retries them
+                if prediction is None:
+                    failed += 1
+                    continue
+
+                done[(name, qid)] = prediction
+                self._checkpoint(f, {
+                    "fingerprint": fingerprint,
+                    "generator": name,
+                    "id": qid,
+                    "question": question,
+                    "prediction": prediction,
+                    "seconds": seconds,
+                })
+
+        wall_seconds = time.perf_counter() - started
+        return {
+            "generated": len(pending) - failed,
+            "failed": failed,
+            "wall_seconds": wall_seconds,
+            "throughput": (len(pending) - failed) / wall_seconds if pending else 0.0,
+        }
+
+    def evaluate(self, df_val, generators_dict, resume=True):
         df_subset = df_val.head(rag_settings.EVAL_SUBSET_SIZE)
         refs = [normalize_arabic(r) for r in df_subset["answer_text"].tolist()]
 
-        all_preds = {k: [] for k in generators_dict}
+        # Without an id column the row index is the key; the fingerprint covers the rows themselves
+        ids = df_subset["id"] if "id" in df_subset.columns else df_subset.index
+        ids = [str(qid) for qid in ids]
+        questions = list(zip(ids, df_subset["question"].tolist()))
 
-        for _, row in df_subset.iterrows():
-            for name, gen in generators_dict.items():
-                all_preds[name].append(self.safe_generate(gen, row["question"]))
-            time.sleep(3)
+        fingerprint = run_fingerprint(questions, refs)
+        done = self.load_checkpoint(fingerprint) if resume else {}
+        print(f"Resuming with {len(done)} checkpointed predictions" if done else "Starting a fresh run")
+
+        directory = os.path.dirname(self.results_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        started = time.perf_counter()
+        with open(self.results_path, "a" if resume else "w", encoding="utf-8") as f, \
+                ThreadPoolExecutor(max_workers=len(generators_dict)) as pool:
+            futures = {
+                name: pool.submit(self.run_generator, name, gen, questions, done, f, fingerprint)
+                for name, gen in generators_dict.items()
+            }
+            timings = {name: future.result() for name, future in futures.items()}
+        print(f"Generation took {time.perf_counter() - started:.1f}s")
 
         results = {}
-        for name, preds in all_preds.items():
+        for name in generators_dict:
+            preds = [done.get((name, qid), "ERROR") for qid in ids]
             results[name] = {
                 "bleu2": compute_bleu(preds, refs),
                 "f1": binary_token_f1(preds, refs),
                 "em": np.mean([exact_match(p, r) for p, r in zip(preds, refs)]),
                 "semantic_sim": semantic_similarity(
                     self.embedder.model, preds, refs
-                )
+                ),
+                **timings[name],
             }
 
         return results
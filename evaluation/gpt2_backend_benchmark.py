@@ -0,0 +1,30 @@
+from transformers import AutoTokenizer
+
+from rag.generation import gpt2_backends
+from rag.registry import process_rss_bytes, estimate_memory
+from config.settings_rag import rag_settings
+
+tokenizer = AutoTokenizer.from_pretrained(rag_settings.GPT2_MODEL)
+reference = gpt2_backends.load_pytorch()
+
+print("\n=== GPT-2 Backend Benchmark ===")
+print(f"pytorch: {estimate_memory(reference) / 1024 ** 2:.1f} MB float tensors")
+
+for backend in ("int8", "onnx"):
+    try:
+        candidate = gpt2_backends.load_backend(backend)
+    except ImportError as e:
+        print(f"\n-- {backend} -- skipped: {e}")
+        continue
+
+    parity = gpt2_backends.check_parity(candidate, reference, tokenizer)
+    speedup = parity["reference_latency"] / parity["candidate_latency"]
+
+    print(f"\n-- {backend} --")
+    for k, v in parity.items():
+        print(f"{k}: {v:.4f}")
+    print(f"speedup: {speedup:.2f}x")
+    print(f"float tensors: {estimate_memory(candidate) / 1024 ** 2:.1f} MB")
+    print(f"process_rss: {process_rss_bytes() / 1024 ** 2:.1f} MB")
+
+    del candidate
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+
+from rag.data.data_loader import load_arcd_dataset
+from rag.data.text_cleaning import clean_dataframe
+from rag.registry import registry
+from rag.vector_store.base import content_hash, point_id_for
+from rag.vector_store.qdrant_store import VectorDB
+from config.settings_rag import rag_settings
+
+# Index profiles to compare; keys override the defaults from RAGSettings
+PROFILES = {
+    "default": {},
+    "hnsw_m32": {"m": 32, "ef_construct": 200, "ef": 256},
+    "int8": {"quantization": "int8"},
+    "int8_on_disk": {"quantization": "int8", "on_disk": True},
+    "binary": {"quantization": "binary", "oversampling": 3.0},
+}
+
+K = rag_settings.TOP_K_RETRIEVAL
+
+
+def wait_until_indexed(vector_db, timeout=600):
+    """Block until Qdrant reports the collection as fully optimized"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if vector_db.client.get_collection(vector_db.collection_name).status == "green":
+            return
+        time.sleep(1)
+
+
+df_train, df_val = load_arcd_dataset()
+contexts = clean_dataframe(df_train)["context"].drop_duplicates().tolist()
+questions = clean_dataframe(df_val)["question"].tolist()
+
+embedder = registry.get("embedder")
+vectors = embedder.generate_embeddings(contexts).cpu().numpy()
+query_vectors = embedder.generate_query_embeddings(questions)
+ids = [point_id_for(content_hash(c)) for c in contexts]
+payloads = [{"context": c} for c in contexts]
+
+exact_ids = None
+results = {}
+
+for name, profile in PROFILES.items():
+    vector_db = VectorDB(
+        collection_name=f"{rag_settings.COLLECTION_NAME}_bench_{name}",
+        index_profile=profile
+    )
+    vector_db.create_collection(vectors.shape[1])
+    vector_db.bulk_upsert(ids, vectors, payloads)
+    wait_until_indexed(vector_db)
+
+    # Exact search on the unquantized baseline is the ground truth
+    if exact_ids is None:
+        exact_ids = [
+            {p.id for p in vector_db.search(q, limit=K, exact=True).points}
+            for q in query_vectors
+        ]
+
+    latencies = []
+    recalls = []
+    for q, truth in zip(query_vectors, exact_ids):
+        start = time.perf_counter()
+        found = vector_db.search(q, limit=K).points
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({p.id for p in found} & truth) / K)
+
+    results[name] = {
+        "recall@k": float(np.mean(recalls)),
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+    vector_db.client.delete_collection(vector_db.collection_name)
+
+print(f"\n=== Index Benchmark ({len(contexts)} vectors, {len(questions)} queries, k={K}) ===")
+for name, metrics in results.items():
+    print(f"\n-- {name} --")
+    for k, v in metrics.items():
+        print(f"{k}: {v:.4f}")
@@ -112,4 +112,44 @@ def reciprocal_rank(relevance):
     for i, rel in enumerate(relevance):
         if rel:
             return 1 / (i + 1)
-    return 0.0
\ No newline at end of file
+    return 0.0
+
+
+# Vectorized Retrieval Metrics 
+def retrieval_metrics_matrix(relevance, k):
+    """
+    Per-query retrieval metrics for a (queries, k) relevance matrix in one
+    pass; row i gives the same values as the per-list functions above.
+    """
+    rel = np.asarray(relevance, dtype=bool)[:, :k].astype(np.float64)
+    ranks = np.arange(1, rel.shape[1] + 1)
+    hits = rel.sum(axis=1)
+    found = hits > 0
+
+    precision = hits / k if k > 0 else np.zeros_like(hits)
+    recall = found.astype(np.float64)
+    f1 = np.divide(
+        2 * precision * recall, precision + recall,
+        out=np.zeros_like(precision), where=(precision + recall) > 0
+    )
+
+    # AP: precision at every relevant rank, averaged over the hits
+    ap_sum = (np.cumsum(rel, axis=1) / ranks * rel).sum(axis=1)
+    ap = np.divide(ap_sum, hits, out=np.zeros_like(ap_sum), where=found)
+
+    rr = np.where(found, 1 / (rel.argmax(axis=1) + 1), 0.0)
+
+    # Ideal DCG puts all hits first: the discount sum over the first `hits` ranks
+    discounts = 1 / np.log2(ranks + 1)
+    dcg = rel @ discounts
+    idcg = np.concatenate([[0.0], np.cumsum(discounts)])[hits.astype(int)]
+    ndcg_scores = np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "ap": ap,
+        "rr": rr,
+        "ndcg": ndcg_scores,
+    }
\ No newline at end of file
@@ -1,8 +1,10 @@
+import numpy as np
+import pandas as pd
 from tqdm import tqdm
 from sentence_transformers import util
 
-from rag.embeddings.embeddings import EmbeddingGenerator
-from rag.retrieval.retrieval import Retriever
+from rag.registry import registry
+from rag.vector_store.base import to_numpy
 from config.settings_rag import rag_settings
 
 from evaluation.metrics import (
@@ -11,17 +13,95 @@ from evaluation.metrics import (
     recall_at_k,
     f1_at_k,
     average_precision,
-    reciprocal_rank
+    reciprocal_rank,
+    retrieval_metrics_matrix
 )
 
 
 class RetrievalEvaluator:
     def __init__(self, df_val):
         self.df_val = df_val
-        self.retriever = Retriever()
-        self.embedder = EmbeddingGenerator()
+        self.retriever = registry.get("retriever")
+        self.embedder = registry.get("embedder")
+
+    def evaluate(self, vectorized=True):
+        if vectorized:
+            return self.evaluate_vectorized()
+        return self.evaluate_per_row()
+
+    def gold_embeddings(self):
+        """Gold-context embedding per row; each distinct context is embedded once"""
+        codes, contexts = pd.factorize(self.df_val["context"])
+        # The same texts were embedded at indexing time, so these come from the embedding cache
+        embeddings = to_numpy(self.embedder.generate_embeddings(list(contexts)))
+        return embeddings[codes]
+
+    def retrieved_vectors(self, k):
+        """
+        Stored vectors of every row's retrieved contexts as a (rows, k, dim)
+        array, plus a (rows, k) mask of the slots that hold a result
+        """
+        questions = self.df_val["question"].tolist()
+        batch_size = rag_settings.RETRIEVAL_BATCH_SIZE
+        vectors = None
+        mask = np.zeros((len(questions), k), dtype=bool)
+
+        for start in tqdm(range(0, len(questions), batch_size), desc="Retrieving"):
+            batch = self.retriever.retrieve_batch(
+                questions[start:start + batch_size],
+                top_k=k,
+                with_vectors=True
+            )
+            for row, retrieved in enumerate(batch, start=start):
+                for rank, ctx in enumerate(retrieved[:k]):
+                    vector = np.asarray(ctx["vector"], dtype=np.float32)
+                    if vectors is None:
+                        vectors = np.zeros((len(questions), k, len(vector)), dtype=np.float32)
+                    vectors[row, rank] = vector
+                    mask[row, rank] = True
+
+        return vectors, mask
+
+    def evaluate_vectorized(self):
+        """
+        Score the whole validation set at once: gold contexts are embedded
+        once, retrieved contexts use the vectors returned by the search,
+        and the metrics are computed over the full relevance matrix.
+        """
+        total = len(self.df_val)
+        k = rag_settings.TOP_K_EVALUATION
+        threshold = rag_settings.SIMILARITY_THRESHOLD_EVALUATION
+
+        vectors, mask = self.retrieved_vectors(k)
+        if vectors is None:
+            sims = np.zeros(mask.shape, dtype=np.float32)
+        else:
+            gold = self.gold_embeddings()
+            gold /= np.maximum(np.linalg.norm(gold, axis=1, keepdims=True), 1e-12)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=2, keepdims=True), 1e-12)
+            sims = np.einsum("rkd,rd->rk", vectors, gold)
+
+        relevance = (sims >= threshold) & mask
+        metrics = retrieval_metrics_matrix(relevance, k)
+
+        # Best similarity per row; rows without results count as 0
+        best = np.where(mask, sims, -np.inf).max(axis=1)
+        best = np.where(mask.any(axis=1), best, 0.0)
 
-    def evaluate(self):
+        return {
+            "num_samples": total,
+            "soft_recall@k": float(relevance.any(axis=1).mean()),
+            "avg_sbert_similarity": float(best.mean()),
+            "precision@k": float(metrics["precision"].mean()),
+            "recall@k": float(metrics["recall"].mean()),
+            "f1@k": float(metrics["f1"].mean()),
+            "map": float(metrics["ap"].mean()),
+            "mrr": float(metrics["rr"].mean()),
+            "ndcg@k": float(metrics["ndcg"].mean())
+        }
+
+    def evaluate_per_row(self):
+        """Reference implementation: re-encodes the gold and retrieved contexts of each row"""
         total = len(self.df_val)
 
         soft_hits = 0
@@ -37,12 +117,16 @@ class RetrievalEvaluator:
         k = rag_settings.TOP_K_EVALUATION
         threshold = rag_settings.SIMILARITY_THRESHOLD_EVALUATION
 
-        for _, row in tqdm(self.df_val.iterrows(), total=total):
-
-            retrieved = self.retriever.retrieve_similar_context(
-                row["question"],
+        questions = self.df_val["question"].tolist()
+        batch_size = rag_settings.RETRIEVAL_BATCH_SIZE
+        all_retrieved = []
+        for start in tqdm(range(0, total, batch_size), desc="Retrieving"):
+            all_retrieved.extend(self.retriever.retrieve_batch(
+                questions[start:start + batch_size],
                 top_k=k
-            )
+            ))
+
+        for (_, row), retrieved in tqdm(zip(self.df_val.iterrows(), all_retrieved), total=total):
 
             if not retrieved:
                 retrieval_precisions.append(0.0)
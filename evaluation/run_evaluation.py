@@ -1,4 +1,5 @@
 from rag.pipeline import RAGPipeline
+from rag.registry import registry
 from evaluation.retrieval_eval import RetrievalEvaluator
 from evaluation.generation_eval import GenerationEvaluator
 
@@ -13,6 +14,10 @@ print("\n=== Retrieval Evaluation ===")
 for k, v in retrieval_results.items():
     print(f"{k}: {v:.4f}")
 
+print("\n=== Query Embedding Cache ===")
+for k, v in registry.get("query_cache").stats().items():
+    print(f"{k}: {v}")
+
 # Generation
 generation_eval = GenerationEvaluator()
 
@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from rag.telemetry import telemetry
+
+# Queued after the last item by close(); everything before it is still processed
+_CLOSE = object()
+
+
+def power_of_two_buckets(limit):
+    """Histogram buckets 1, 2, 4, ... up to and including limit"""
+    buckets = [1]
+    while buckets[-1] < limit:
+        buckets.append(min(buckets[-1] * 2, limit))
+    return buckets
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching worker.
+
+    Callers submit single items; a worker thread collects whatever
+    arrives within a short window (up to a maximum batch size), runs them
+    through one batched call and resolves each caller's future with its
+    own result. `close` stops accepting items and flushes everything
+    already submitted.
+    """
+
+    def __init__(self, batch_fn, name, max_batch_size, max_wait_ms):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self._batch_sizes = telemetry.histogram(
+            f"{name}_batcher.batch_size", buckets=power_of_two_buckets(max_batch_size)
+        )
+        self._queue_depths = telemetry.histogram(
+            f"{name}_batcher.queue_depth", buckets=[0] + power_of_two_buckets(max_batch_size * 8)
+        )
+        self._queue_waits = telemetry.histogram(f"{name}_batcher.queue_wait_seconds")
+
+    def submit(self, item):
+        """Queue an item and return a Future for its result"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} batcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"{self.name}-batcher", daemon=True
+                )
+                self._thread.start()
+            # Enqueued under the lock so nothing can land behind the close marker
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def close(self, timeout=None):
+        """Stop accepting items and wait until the submitted ones are processed"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(_CLOSE)
+
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _CLOSE:
+                return
+
+            batch = [entry]
+            closing = False
+            deadline = time.perf_counter() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _CLOSE:
+                    closing = True
+                    break
+                batch.append(entry)
+
+            self._queue_depths.observe(self._queue.qsize())
+            self._batch_sizes.observe(len(batch))
+            self._run_batch(batch)
+            if closing:
+                return
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self._queue_waits.observe(started - enqueued)
+
+        try:
+            results = list(self.batch_fn([item for item, _, _ in batch]))
+            # zip would leave the surplus callers waiting forever
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"{self.name} batch function returned {len(results)} results for {len(batch)} items"
+                )
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
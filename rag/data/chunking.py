@@ -0,0 +1,137 @@
+import re
+
+from config.settings_rag import rag_settings
+
+# Sentence terminators (Latin and Arabic punctuation) followed by a space, or a line break
+_SENTENCE_END = re.compile(r'[.!?؟؛]+(?=\s|$)|\n')
+_WORD = re.compile(r'\S+')
+
+
+def sentence_spans(text):
+    """(start, end) offsets of the non-empty sentences of text"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.extend(_trim(text, start, match.end()))
+        start = match.end()
+    spans.extend(_trim(text, start, len(text)))
+    return spans
+
+
+def _trim(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return [(start, end)] if start < end else []
+
+
+def _split_long(text, span, chunk_size):
+    """Split a sentence longer than chunk_size at word boundaries"""
+    start, end = span
+    if end - start <= chunk_size:
+        return [span]
+
+    pieces = []
+    piece_start = piece_end = None
+    for word in _WORD.finditer(text, start, end):
+        if piece_start is not None and word.end() - piece_start > chunk_size:
+            pieces.append((piece_start, piece_end))
+            piece_start = None
+        if piece_start is None:
+            piece_start = word.start()
+        piece_end = word.end()
+    pieces.append((piece_start, piece_end))
+    return pieces
+
+
+def chunk_text(text, chunk_size=rag_settings.CHUNK_SIZE, overlap=rag_settings.CHUNK_OVERLAP):
+    """
+    Split text into chunks of whole sentences, each at most chunk_size
+    characters (unless a single word is longer). Consecutive chunks share
+    the trailing sentences of the previous chunk, up to overlap
+    characters. Chunks are dicts with `text` and its `start`/`end`
+    offsets in the original text.
+    """
+    spans = [
+        piece
+        for span in sentence_spans(text)
+        for piece in _split_long(text, span, chunk_size)
+    ]
+
+    chunks = []
+    i = 0
+    while i < len(spans):
+        j = i
+        while j + 1 < len(spans) and spans[j + 1][1] - spans[i][0] <= chunk_size:
+            j += 1
+
+        start, end = spans[i][0], spans[j][1]
+        chunks.append({"text": text[start:end], "start": start, "end": end})
+        if j + 1 == len(spans):
+            break
+
+        # Step back over the sentences that fit in the overlap, as long as the
+        # next chunk still has room for the first new sentence
+        k = j + 1
+        while (k - 1 > i
+               and spans[j][1] - spans[k - 1][0] <= overlap
+               and spans[j + 1][1] - spans[k - 1][0] <= chunk_size):
+            k -= 1
+        i = k
+
+    return chunks
+
+
+def merge_adjacent_chunks(results):
+    """
+    Merge retrieved chunks of the same parent document with consecutive
+    chunk indexes into one result, removing their overlap. Results carry
+    `parent_id` and `chunk_index` at the top level, so only chunks that
+    are actually merged need their text. Merged results take the position
+    and score of their best chunk; results that are not chunks are passed
+    through unchanged.
+    """
+    positioned = []
+    by_parent = {}
+    for position, result in enumerate(results):
+        if result.get("parent_id") is None or result.get("chunk_index") is None:
+            positioned.append((position, result))
+        else:
+            by_parent.setdefault(result["parent_id"], []).append((position, result))
+
+    for chunks in by_parent.values():
+        chunks.sort(key=lambda chunk: chunk[1]["chunk_index"])
+        run = chunks[:1]
+        for chunk in chunks[1:]:
+            if chunk[1]["chunk_index"] == run[-1][1]["chunk_index"] + 1:
+                run.append(chunk)
+            else:
+                positioned.append(_merge_run(run))
+                run = [chunk]
+        positioned.append(_merge_run(run))
+
+    return [result for _, result in sorted(positioned, key=lambda item: item[0])]
+
+
+def _merge_run(run):
+    if len(run) == 1:
+        return run[0]
+
+    text = run[0][1]["context"]
+    end = run[0][1]["payload"]["end"]
+    for _, result in run[1:]:
+        payload = result["payload"]
+        if payload["start"] >= end:
+            text += " " + result["context"]
+        else:
+            text += result["context"][end - payload["start"]:]
+        end = payload["end"]
+
+    position, best = min(run, key=lambda item: item[0])
+    return position, {
+        **best,
+        "context": text,
+        "score": max(result["score"] for _, result in run),
+        "chunk_indexes": [result["chunk_index"] for _, result in run],
+    }
@@ -1,28 +1,67 @@
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from config.settings_rag import rag_settings
+
+# Everything normalization removes, in one character class: diacritics
+# (U+0617-U+061A, U+064B-U+0652) and any character that is not Arabic,
+# an ASCII digit, whitespace or allowed punctuation
+_REMOVED = re.compile(r'[^\u0600-\u0616\u061B-\u064A\u0653-\u06FF0-9\s؟.,:؛!]+')
+
 
 def normalize_arabic(text):
     """Normalize Arabic text by removing diacritics and unwanted characters"""
     if not isinstance(text, str):
         return ""
-    
-    text = re.sub(r'[\u0617-\u061A\u064B-\u0652]', '', text)
-    text = re.sub(r'[^\u0600-\u06FF0-9\s؟.,:؛!]', '', text)
-    return re.sub(r'\s+', ' ', text).strip()
 
+    # split() also collapses whitespace runs and trims the ends
+    return " ".join(_REMOVED.sub("", text).split())
+
+
+def normalize_texts(texts):
+    """Normalize a list of texts"""
+    return [normalize_arabic(text) for text in texts]
+
+
+def normalize_many(texts, workers=rag_settings.TEXT_CLEANING_WORKERS):
+    """
+    Normalize a sequence of texts, fanning out over processes once the
+    input is large enough to be worth the serialization
+    """
+    texts = list(texts)
+    size = sum(len(text) for text in texts)
+    if workers <= 1 or size < rag_settings.TEXT_CLEANING_PARALLEL_MIN_CHARS:
+        return normalize_texts(texts)
 
-def clean_dataframe(df):
+    chunk_size = -(-len(texts) // (workers * 4))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [text for chunk in executor.map(normalize_texts, chunks) for text in chunk]
+
+
+def clean_dataframe(df, workers=rag_settings.TEXT_CLEANING_WORKERS):
     """Clean all text columns in a dataframe"""
     df_clean = df.copy()
-    
-    for col in ['context', 'question']:
-        if col in df_clean.columns:
-            df_clean[col] = df_clean[col].astype(str).apply(normalize_arabic)
-    
-    # Extract and clean answer text
+
+    # Extract answer text
     if 'answers' in df_clean.columns:
-        df_clean['answer_text'] = df_clean['answers'].apply(
+        df_clean['answer_text'] = df_clean['answers'].map(
             lambda x: x['text'][0] if x['text'] else ""
         )
-        df_clean['answer_text'] = df_clean['answer_text'].astype(str).apply(normalize_arabic)
-    
-    return df_clean
\ No newline at end of file
+
+    columns = [col for col in ['context', 'question', 'answer_text'] if col in df_clean.columns]
+    if not columns:
+        return df_clean
+
+    # Normalize each distinct string across all text columns once; ARCD
+    # repeats every context for each of its questions
+    stacked = pd.concat([df_clean[col].astype(str) for col in columns], ignore_index=True)
+    codes, uniques = pd.factorize(stacked)
+    normalized = pd.Index(normalize_many(uniques, workers=workers))[codes]
+
+    rows = len(df_clean)
+    for i, col in enumerate(columns):
+        df_clean[col] = normalized[i * rows:(i + 1) * rows].to_numpy()
+
+    return df_clean
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+import uuid
+from pathlib import Path
+
+import numpy as np
+from config.settings_rag import rag_settings
+
+
+def text_key(text):
+    """Content hash of a text after unicode and whitespace normalization"""
+    normalized = " ".join(unicodedata.normalize("NFC", str(text)).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def model_key(model_name):
+    """Filesystem-safe directory name for an embedding model"""
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+    digest = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:8]
+    return f"{safe_name}-{digest}"
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk embedding cache.
+
+    Each model gets its own directory of immutable segments: a float32
+    `.npy` array opened memory-mapped, and a `.keys` file listing the text
+    hash of every row. A segment only becomes visible once its `.keys`
+    file is atomically renamed into place, so several worker processes
+    on one host can read and write the same directory without locking.
+    """
+
+    def __init__(self, model_name, cache_dir=rag_settings.EMBEDDING_CACHE_DIR,
+                 max_segments=rag_settings.EMBEDDING_CACHE_MAX_SEGMENTS):
+        self.model_name = model_name
+        self.max_segments = max_segments
+        self.directory = Path(cache_dir) / model_key(model_name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._index = {}
+        self._segments = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        """Load segments written since the last refresh (possibly by other processes)"""
+        with self._lock:
+            for keys_path in sorted(self.directory.glob("*.keys")):
+                name = keys_path.stem
+                if name in self._segments:
+                    continue
+                try:
+                    vectors = np.load(self.directory / f"{name}.npy", mmap_mode="r")
+                    keys = keys_path.read_text(encoding="utf-8").split()
+                except (FileNotFoundError, ValueError):
+                    # Removed by a concurrent compaction or still being written
+                    continue
+
+                self._segments[name] = vectors
+                for row, key in enumerate(keys[:len(vectors)]):
+                    self._index.setdefault(key, (name, row))
+
+    def lookup(self, keys):
+        """Return a dict of key -> vector for every key present in the cache"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                location = self._index.get(key)
+                if location is not None:
+                    name, row = location
+                    found[key] = self._segments[name][row]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def store(self, keys, vectors):
+        """Persist new vectors as one immutable segment"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+
+        name = f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._write_segment(name, keys, vectors)
+
+        segment = np.load(self.directory / f"{name}.npy", mmap_mode="r")
+        with self._lock:
+            self._segments[name] = segment
+            for row, key in enumerate(keys):
+                self._index.setdefault(key, (name, row))
+            too_many = len(self._segments) > self.max_segments
+
+        # Bound the number of open memory maps and files in long-running processes
+        if too_many:
+            self.compact()
+
+    def compact(self):
+        """Merge all segments into a single one to keep directory listings short"""
+        self.refresh()
+        with self._lock:
+            old_segments = list(self._segments)
+            if len(old_segments) < 2:
+                return
+            keys = list(self._index)
+            vectors = np.stack([
+                self._segments[name][row] for name, row in self._index.values()
+            ])
+
+        name = f"{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._write_segment(name, keys, vectors)
+
+        merged = np.load(self.directory / f"{name}.npy", mmap_mode="r")
+        with self._lock:
+            self._segments = {name: merged}
+            self._index = {key: (name, row) for row, key in enumerate(keys)}
+
+        # Open memory maps in other processes keep the old files readable
+        for old in old_segments:
+            for suffix in (".keys", ".npy"):
+                try:
+                    (self.directory / f"{old}{suffix}").unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _write_segment(self, name, keys, vectors):
+        """Write a segment; the `.keys` rename is the commit point"""
+        tmp_suffix = f".tmp-{uuid.uuid4().hex[:8]}"
+
+        npy_tmp = self.directory / f"{name}.npy{tmp_suffix}"
+        with open(npy_tmp, "wb") as f:
+            np.save(f, vectors)
+        os.replace(npy_tmp, self.directory / f"{name}.npy")
+
+        keys_tmp = self.directory / f"{name}.keys{tmp_suffix}"
+        keys_tmp.write_text("\n".join(keys), encoding="utf-8")
+        os.replace(keys_tmp, self.directory / f"{name}.keys")
+
+    @property
+    def num_segments(self):
+        return len(self._segments)
+
+    def stats(self):
+        """Hit/miss counters and cache size"""
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._index),
+            "segments": len(self._segments),
+        }
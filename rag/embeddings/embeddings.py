@@ -1,20 +1,73 @@
-from sentence_transformers import SentenceTransformer
+import numpy as np
+import torch
 from config.settings_rag import rag_settings
+from rag.embeddings import encoder_backends
+from rag.embeddings.embedding_cache import EmbeddingCache, text_key
 
 class EmbeddingGenerator:
-    def __init__(self, model_name=rag_settings.EMBEDDING_MODEL):
-        self.model = SentenceTransformer(model_name)
-    
-    def generate_embeddings(self, texts, batch_size=16):
-        """Generate embeddings for a list of texts"""
-        embeddings = self.model.encode(
+    def __init__(self, model_name=rag_settings.EMBEDDING_MODEL, use_cache=rag_settings.EMBEDDING_CACHE_ENABLED,
+                 backend=rag_settings.EMBEDDING_BACKEND, parity_texts=None):
+        self.model_name = model_name
+        self.backend = backend
+        self.model = self._load_model(parity_texts)
+
+        # Vectors from different backends are close but not identical, so they are cached apart
+        cache_name = model_name if self.backend == "torch" else f"{model_name}@{self.backend}"
+        self.cache = EmbeddingCache(cache_name) if use_cache else None
+
+    def _load_model(self, parity_texts):
+        """Load the configured backend, enabling it only if it matches the reference model"""
+        if self.backend == "torch":
+            return encoder_backends.load_torch(self.model_name)
+
+        candidate = encoder_backends.load_backend(self.backend, self.model_name)
+        reference = encoder_backends.load_torch(self.model_name)
+        parity = encoder_backends.check_parity(
+            candidate, reference, parity_texts or encoder_backends.sample_parity_texts()
+        )
+        print(f"Embedding {self.backend} parity: {parity}")
+
+        if parity["min_cosine"] < rag_settings.EMBEDDING_PARITY_MIN_COSINE:
+            print(f"Embedding {self.backend} backend failed the parity check, falling back to torch")
+            self.backend = "torch"
+            return reference
+
+        return candidate
+
+    def generate_embeddings(self, texts, batch_size=16, use_cache=True):
+        """
+        Generate embeddings for a list of texts, encoding only texts missing
+        from the cache. One-off content (ingested documents) should pass
+        use_cache=False so it does not add segments to the disk cache.
+        """
+        if not use_cache or self.cache is None or len(texts) == 0:
+            return self._encode(texts, batch_size)
+
+        keys = [text_key(text) for text in texts]
+        cached = self.cache.lookup(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_embeddings = self._encode(list(missing.values()), batch_size).cpu().numpy()
+            self.cache.store(list(missing), new_embeddings)
+            cached.update(zip(missing, new_embeddings))
+
+        embeddings = np.stack([cached[key] for key in keys]).astype("float32")
+        return torch.from_numpy(embeddings)
+
+    def _encode(self, texts, batch_size):
+        """Encode texts with the underlying model"""
+        return self.model.encode(
             texts,
             batch_size=batch_size,
             normalize_embeddings=True,
             convert_to_tensor=True
         )
-        return embeddings
-    
+
     def generate_single_embedding(self, text):
         """Generate embedding for a single text (qustion)"""
         embedding = self.model.encode(
@@ -23,5 +76,18 @@ class EmbeddingGenerator:
             convert_to_tensor=False
         ).astype("float32")
         return embedding
+
+    def generate_query_embeddings(self, texts, batch_size=64):
+        """Generate embeddings for many questions in one batched model call"""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        ).astype("float32")
+
+    def cache_stats(self):
+        """Embedding cache hit/miss counters, or None when caching is disabled"""
+        return self.cache.stats() if self.cache is not None else None
     
     
\ No newline at end of file
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from config.settings_rag import rag_settings
+
+BACKENDS = ("torch", "onnx", "int8")
+
+
+def load_torch(model_name=rag_settings.EMBEDDING_MODEL):
+    """Reference fp32 PyTorch encoder"""
+    return SentenceTransformer(model_name)
+
+
+def load_onnx(model_name=rag_settings.EMBEDDING_MODEL):
+    """ONNX Runtime encoder; sentence-transformers exports the graph on first load"""
+    try:
+        return SentenceTransformer(model_name, backend="onnx")
+    except ImportError as e:
+        raise ImportError(
+            "The onnx embedding backend requires `sentence-transformers[onnx]`"
+        ) from e
+
+
+def load_int8(model_name=rag_settings.EMBEDDING_MODEL):
+    """PyTorch encoder with dynamic int8 quantization of its linear layers"""
+    model = load_torch(model_name)
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_backend(backend, model_name=rag_settings.EMBEDDING_MODEL):
+    """Load the sentence encoder for the given inference backend"""
+    loaders = {"torch": load_torch, "onnx": load_onnx, "int8": load_int8}
+    if backend not in loaders:
+        raise ValueError(f"Unsupported embedding backend: {backend} (expected one of {BACKENDS})")
+    return loaders[backend](model_name)
+
+
+def sample_parity_texts(size=rag_settings.EMBEDDING_PARITY_SAMPLE_SIZE):
+    """A fixed sample of cleaned ARCD contexts to compare encoders on"""
+    from rag.data.data_loader import load_arcd_dataset
+    from rag.data.text_cleaning import clean_dataframe
+
+    _, df_val = load_arcd_dataset()
+    contexts = clean_dataframe(df_val)["context"].drop_duplicates()
+    return contexts.sample(n=min(size, len(contexts)), random_state=0).tolist()
+
+
+def check_parity(candidate, reference, texts):
+    """
+    Cosine similarity between candidate and reference embeddings of the
+    same texts, plus single-query encode latency of both encoders.
+    """
+    ref = reference.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    cand = candidate.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    cosines = np.sum(ref * cand, axis=1)
+
+    latencies = {}
+    for name, model in (("reference", reference), ("candidate", candidate)):
+        start = time.perf_counter()
+        for text in texts:
+            model.encode(text, normalize_embeddings=True)
+        latencies[name] = (time.perf_counter() - start) / len(texts)
+
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "reference_latency": latencies["reference"],
+        "candidate_latency": latencies["candidate"],
+    }
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+from config.settings_rag import rag_settings
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings, bounded both by the number
+    of entries and by the total bytes of the cached vectors.
+    """
+
+    def __init__(self, max_entries=rag_settings.QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes=rag_settings.QUERY_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached embedding for key, or None"""
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key, embedding):
+        """Cache an embedding, evicting least recently used entries if needed"""
+        size = embedding.nbytes
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+
+            self._entries[key] = embedding
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached embedding for key, computing and caching it on a miss"""
+        embedding = self.get(key)
+        if embedding is None:
+            embedding = compute(key)
+            self.put(key, embedding)
+        return embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit rate, eviction count and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+            }
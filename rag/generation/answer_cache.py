@@ -0,0 +1,143 @@
+import threading
+import time
+
+import numpy as np
+from config.settings_rag import rag_settings
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of generated answers keyed by question embedding.
+
+    A lookup returns the answer of the most similar cached question when
+    the cosine similarity clears the threshold. Entries expire after a
+    TTL, the least recently used one is evicted when the cache is full,
+    and entries are invalidated when a newly ingested document would
+    outrank the contexts their answer was generated from.
+
+    Both the cache and its invalidation are per process: a document
+    ingested through one worker does not invalidate answers cached by the
+    others, so ANSWER_CACHE_TTL is the upper bound on how long another
+    worker can keep serving an answer that predates it.
+    """
+
+    def __init__(self, threshold=rag_settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                 ttl=rag_settings.ANSWER_CACHE_TTL,
+                 max_entries=rag_settings.ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # Slot-based storage: row i of the matrix belongs to entries[i]
+        self._matrix = None
+        self._entries = [None] * max_entries
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, query_embedding):
+        """Return the cached entry for the closest question, or None"""
+        now = time.time()
+        with self._lock:
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            self._drop_expired(now)
+            scores = self._matrix @ np.asarray(query_embedding, dtype=np.float32)
+            best = int(np.argmax(scores))
+            entry = self._entries[best]
+
+            if entry is None or scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry["last_used"] = now
+            self.hits += 1
+            return {**entry, "similarity": float(scores[best])}
+
+    def put(self, query_embedding, question, answer, contexts):
+        """Cache an answer together with the contexts it was generated from"""
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        now = time.time()
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, len(query_embedding)), dtype=np.float32)
+
+            self._drop_expired(now)
+            slot = self._free_slot()
+
+            self._matrix[slot] = query_embedding
+            self._entries[slot] = {
+                "question": question,
+                "answer": answer,
+                "contexts": contexts,
+                # A new document scoring at least this high would change the contexts
+                "min_score": min(
+                    (ctx.get("score", 0.0) for ctx in contexts),
+                    default=rag_settings.SIMILARITY_THRESHOLD
+                ),
+                "created_at": now,
+                "last_used": now,
+            }
+
+    def invalidate_for_vectors(self, document_embeddings):
+        """Drop entries whose retrieved contexts would be affected by new documents"""
+        with self._lock:
+            if self._matrix is None:
+                return 0
+
+            vectors = np.atleast_2d(np.asarray(document_embeddings, dtype=np.float32))
+            # Best score any new document reaches against each cached question
+            scores = (self._matrix @ vectors.T).max(axis=1)
+
+            dropped = 0
+            for slot, entry in enumerate(self._entries):
+                if entry is not None and scores[slot] >= entry["min_score"]:
+                    self._clear_slot(slot)
+                    dropped += 1
+
+            self.invalidations += dropped
+            return dropped
+
+    def clear(self):
+        with self._lock:
+            for slot in range(self.max_entries):
+                self._clear_slot(slot)
+
+    def _free_slot(self):
+        for slot, entry in enumerate(self._entries):
+            if entry is None:
+                return slot
+
+        slot = min(range(self.max_entries), key=lambda i: self._entries[i]["last_used"])
+        self._clear_slot(slot)
+        self.evictions += 1
+        return slot
+
+    def _drop_expired(self, now):
+        for slot, entry in enumerate(self._entries):
+            if entry is not None and now - entry["created_at"] > self.ttl:
+                self._clear_slot(slot)
+                self.evictions += 1
+
+    def _clear_slot(self, slot):
+        self._entries[slot] = None
+        if self._matrix is not None:
+            self._matrix[slot] = 0.0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": sum(entry is not None for entry in self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
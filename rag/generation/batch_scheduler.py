@@ -0,0 +1,18 @@
+from rag.batching import MicroBatcher
+from config.settings_rag import rag_settings
+
+
+class GenerationBatcher(MicroBatcher):
+    """
+    Micro-batching scheduler for generation: concurrent prompts are run
+    through one batched generate call.
+    """
+
+    def __init__(self, batch_fn, name="gpt2",
+                 max_batch_size=rag_settings.GPT2_MAX_BATCH_SIZE,
+                 max_wait_ms=rag_settings.GPT2_BATCH_WAIT_MS):
+        super().__init__(batch_fn, name=name, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def generate(self, prompt):
+        """Blocking helper: submit a prompt and wait for its result"""
+        return self.submit(prompt).result()
@@ -0,0 +1,358 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from rag.telemetry import telemetry
+from config.settings_rag import rag_settings
+
+
+class GeminiUnavailableError(Exception):
+    """Gemini could not answer within the call's deadline and retry budget"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(GeminiUnavailableError):
+    """Raised without calling Gemini while the circuit breaker is open"""
+
+
+def error_status(error):
+    """HTTP status of an upstream error, if it carries one"""
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_overloaded(error):
+    return error_status(error) == 429
+
+
+def is_retryable(error):
+    """Rate limiting, server errors, timeouts and connection failures are retried"""
+    status = error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError, OSError))
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter. `reserve` always takes a token and returns
+    how long the caller has to wait before using it, so waiting callers
+    are served in order instead of polling.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def cancel(self):
+        """Return a reserved token that will not be used"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit: grows additively (about +1 per window of
+    `limit` fast calls) and is cut multiplicatively when a call is rate
+    limited or slower than the latency target.
+
+    Threads wait on a condition; coroutines park a future of their own
+    event loop, which `release` resolves through call_soon_threadsafe, so
+    waiting callers are woken only when a slot frees up.
+    """
+
+    def __init__(self, initial, minimum, maximum, latency_target, backoff=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._waiters = deque()
+
+    def _available(self):
+        return self.in_flight < int(self.limit)
+
+    def try_acquire(self):
+        with self._cond:
+            if not self._available():
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self, timeout):
+        with self._cond:
+            if not self._cond.wait_for(self._available, timeout=max(0.0, timeout)):
+                return False
+            self.in_flight += 1
+            return True
+
+    async def aacquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._available():
+                    self.in_flight += 1
+                    return True
+                entry = (loop, loop.create_future())
+                self._waiters.append(entry)
+
+            try:
+                await asyncio.wait_for(entry[1], max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self._abandon(entry)
+                return False
+            except BaseException:
+                self._abandon(entry)
+                raise
+
+    def _abandon(self, entry):
+        """Drop a timed out or cancelled waiter"""
+        with self._cond:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            else:
+                # Already woken: pass the wake-up on instead of losing it
+                self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Resolve as many parked coroutines as there are free slots; caller holds the lock"""
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+            loop.call_soon_threadsafe(_resolve, waiter)
+            free -= 1
+
+    def release(self, latency=None, overloaded=False):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.latency_target):
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            self._wake_waiters()
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and
+    rejects calls for `reset_timeout` seconds; then lets a single trial
+    call through, which closes the circuit on success or reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _retry_after(self):
+        """Seconds until a call may be admitted, or None; the caller holds the lock"""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+        if self.state == self.HALF_OPEN and self._trial_in_flight:
+            return self.reset_timeout
+        return None
+
+    def check(self):
+        """Fail fast while calls would be rejected, without taking the trial"""
+        with self._lock:
+            retry_after, state = self._retry_after(), self.state
+        if retry_after is not None:
+            raise CircuitOpenError(f"Gemini circuit breaker is {state}", retry_after=retry_after)
+
+    def before_call(self):
+        """Admit a call; returns True when it is the half-open trial"""
+        with self._lock:
+            retry_after, state = self._retry_after(), self.state
+            if retry_after is None:
+                self._trial_in_flight = state == self.HALF_OPEN
+                return self._trial_in_flight
+        raise CircuitOpenError(f"Gemini circuit breaker is {state}", retry_after=retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class GeminiClient:
+    """
+    Resilient wrapper around a Gemini GenerativeModel with the same
+    generate_content / generate_content_async interface.
+
+    Every call gets a deadline that bounds rate-limit waits, concurrency
+    waits, the request timeouts and the jittered retry backoff. Streamed
+    responses release their concurrency slot once the stream has started.
+    """
+
+    def __init__(self, model, rate_limiter=None, concurrency=None, breaker=None,
+                 timeout=rag_settings.GEMINI_TIMEOUT,
+                 max_retries=rag_settings.GEMINI_MAX_RETRIES,
+                 base_delay=rag_settings.GEMINI_RETRY_BASE_DELAY,
+                 max_delay=rag_settings.GEMINI_RETRY_MAX_DELAY):
+        self.model = model
+        self.rate_limiter = rate_limiter or TokenBucket(
+            rag_settings.GEMINI_RATE_LIMIT, rag_settings.GEMINI_BURST
+        )
+        self.concurrency = concurrency or AIMDLimiter(
+            initial=rag_settings.GEMINI_INITIAL_CONCURRENCY,
+            minimum=rag_settings.GEMINI_MIN_CONCURRENCY,
+            maximum=rag_settings.GEMINI_MAX_CONCURRENCY,
+            latency_target=rag_settings.GEMINI_LATENCY_TARGET
+        )
+        self.breaker = breaker or CircuitBreaker(
+            rag_settings.GEMINI_BREAKER_FAILURES, rag_settings.GEMINI_BREAKER_RESET_SECONDS
+        )
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def generate_content(self, contents, timeout=None, **kwargs):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(deadline))
+            if not self.concurrency.acquire(timeout=deadline - time.monotonic()):
+                raise GeminiUnavailableError("Timed out waiting for a Gemini concurrency slot")
+
+            try:
+                with self._attempt():
+                    return self.model.generate_content(
+                        contents, request_options={"timeout": deadline - time.monotonic()}, **kwargs
+                    )
+            except Exception as e:
+                attempt += 1
+                time.sleep(self._retry_delay(e, attempt, deadline))
+
+    async def generate_content_async(self, contents, timeout=None, **kwargs):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(deadline))
+            if not await self.concurrency.aacquire(timeout=deadline - time.monotonic()):
+                raise GeminiUnavailableError("Timed out waiting for a Gemini concurrency slot")
+
+            try:
+                with self._attempt():
+                    return await self.model.generate_content_async(
+                        contents, request_options={"timeout": deadline - time.monotonic()}, **kwargs
+                    )
+            except Exception as e:
+                attempt += 1
+                await asyncio.sleep(self._retry_delay(e, attempt, deadline))
+
+    def _reserve(self, deadline):
+        """Fail fast on an open breaker and reserve a rate-limit token; returns the wait before calling"""
+        self.breaker.check()
+        wait = self.rate_limiter.reserve()
+        if time.monotonic() + wait >= deadline:
+            self.rate_limiter.cancel()
+            raise GeminiUnavailableError("Gemini rate limit wait exceeds the call deadline")
+        return wait
+
+    @contextmanager
+    def _attempt(self):
+        """
+        One upstream call in an already acquired concurrency slot. The
+        breaker is only asked for admission here, after every wait, and
+        the slot is always released. An attempt that ends without an
+        outcome (cancelled or interrupted) counts as a failed trial.
+        """
+        try:
+            trial = self.breaker.before_call()
+        except BaseException:
+            self.concurrency.release()
+            raise
+
+        started = time.monotonic()
+        # Only successful calls grow the concurrency limit; 429s shrink it
+        latency, overloaded = None, False
+        try:
+            yield
+            latency = time.monotonic() - started
+            self.breaker.record_success()
+            telemetry.observe("gemini.latency_seconds", latency)
+        except Exception as e:
+            if is_retryable(e):
+                overloaded = is_overloaded(e)
+                self.breaker.record_failure()
+                telemetry.observe("gemini.failures", 1)
+            else:
+                # The upstream answered; the request itself was bad
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            if trial:
+                self.breaker.record_failure()
+            raise
+        finally:
+            self.concurrency.release(latency=latency, overloaded=overloaded)
+
+    def _retry_delay(self, error, attempt, deadline):
+        """Backoff before retrying a failed attempt; raises when it must not be retried"""
+        if not is_retryable(error):
+            raise error
+
+        # Equal jitter: half the capped exponential delay plus a random share of the rest
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = cap / 2 + random.uniform(0, cap / 2)
+
+        if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+            raise GeminiUnavailableError(
+                f"Gemini call failed after {attempt} attempts: {error}"
+            ) from error
+        return delay
+
+    def stats(self):
+        return {
+            "concurrency_limit": self.concurrency.limit,
+            "in_flight": self.concurrency.in_flight,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
@@ -1,13 +1,59 @@
 import google.generativeai as genai
-from rag.retrieval.retrieval import Retriever
-from rag.generation.prompt import generate_prompt, truncate_answer
+from rag.registry import registry
+from rag.generation.gemini_client import GeminiUnavailableError
+from rag.generation.prompt import generate_prompt, truncate_answer, NO_RESPONSE, ERROR_PREFIX
+from rag.generation.streaming import StreamTruncator
 from config.settings_rag import rag_settings
 
 
+def generation_config():
+    """Gemini sampling settings shared by every call"""
+    return {
+        "temperature": rag_settings.GEMINI_TEMPERATURE,
+        "top_p": rag_settings.GEMINI_TOP_P,
+        "max_output_tokens": rag_settings.GEMINI_MAX_TOKENS,
+    }
+
+
+def response_text(response):
+    """Joined text of the first candidate, or None if nothing was generated"""
+    if response.candidates and response.candidates[0].content.parts:
+        return "".join(
+            [p.text for p in response.candidates[0].content.parts]
+        ).strip()
+    return None
+
+
+def close_stream(response):
+    """
+    Release an upstream stream that is abandoned before its end (stopping
+    point reached or client gone): close or cancel the response, or the
+    iterator it wraps, whichever the SDK exposes
+    """
+    for target in (response, getattr(response, "_iterator", None)):
+        for name in ("close", "cancel"):
+            method = getattr(target, name, None)
+            if callable(method):
+                method()
+                return
+
+
+def chunk_text(chunk):
+    """Unstripped text of a streamed chunk"""
+    if chunk.candidates and chunk.candidates[0].content.parts:
+        return "".join(p.text for p in chunk.candidates[0].content.parts)
+    return ""
+
+
 class GeminiGenerator:
-    def __init__(self, model):
+    """
+    Gemini answers through a GeminiClient. GeminiUnavailableError is
+    propagated so the API can answer 503 instead of returning error text.
+    """
+
+    def __init__(self, model, retriever=None):
         self.model = model
-        self.retriever = Retriever()
+        self.retriever = retriever or registry.get("retriever")
     
     def generate_with_rag(self, question):
         """Generate answer using RAG with Gemini """
@@ -23,23 +69,19 @@ class GeminiGenerator:
 
             response = self.model.generate_content(
                 prompt_text,
-                generation_config={
-                    "temperature": rag_settings.GEMINI_TEMPERATURE,
-                    "top_p": rag_settings.GEMINI_TOP_P,
-                    "max_output_tokens": rag_settings.GEMINI_MAX_TOKENS,
-                }
+                generation_config=generation_config()
             )
 
-            if response.candidates and response.candidates[0].content.parts:
-                answer = "".join(
-                    [p.text for p in response.candidates[0].content.parts]
-                ).strip()
+            answer = response_text(response)
+            if answer is not None:
                 return truncate_answer(answer), top_context
 
-            return "No response generated", retrieved_contexts
+            return NO_RESPONSE, retrieved_contexts
             
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
-            return f"Error: {str(e)}", []
+            return f"{ERROR_PREFIX}{str(e)}", []
 
 
     def generate_without_rag(self, question):
@@ -47,20 +89,102 @@ class GeminiGenerator:
         try:
             response = self.model.generate_content(
                 question,
-                generation_config={
-                    "temperature": rag_settings.GEMINI_TEMPERATURE,
-                    "top_p": rag_settings.GEMINI_TOP_P,
-                    "max_output_tokens": rag_settings.GEMINI_MAX_TOKENS,
-                }
+                generation_config=generation_config()
             )
             
-            if response.candidates and response.candidates[0].content.parts:
-                answer = "".join(
-                    [p.text for p in response.candidates[0].content.parts]
-                ).strip()
+            answer = response_text(response)
+            if answer is not None:
                 return truncate_answer(answer)
             
-            return "No response generated"
+            return NO_RESPONSE
             
+        except GeminiUnavailableError:
+            raise
         except Exception as e:
-            return f"Error: {str(e)}"
\ No newline at end of file
+            return f"{ERROR_PREFIX}{str(e)}"
+
+    async def agenerate_with_rag(self, question):
+        """Async variant of generate_with_rag using Gemini's async API"""
+        try:
+            retrieved_contexts = await self.retriever.aretrieve_similar_context(question)
+
+            if not retrieved_contexts:
+                return "There is no available answer", []
+
+            top_context = retrieved_contexts[:1]
+
+            prompt_text = generate_prompt(question, top_context)
+
+            response = await self.model.generate_content_async(
+                prompt_text,
+                generation_config=generation_config()
+            )
+
+            answer = response_text(response)
+            if answer is not None:
+                return truncate_answer(answer), top_context
+
+            return NO_RESPONSE, retrieved_contexts
+
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            return f"{ERROR_PREFIX}{str(e)}", []
+
+    async def agenerate_without_rag(self, question):
+        """Async variant of generate_without_rag"""
+        try:
+            response = await self.model.generate_content_async(
+                question,
+                generation_config=generation_config()
+            )
+
+            answer = response_text(response)
+            if answer is not None:
+                return truncate_answer(answer)
+
+            return NO_RESPONSE
+
+        except GeminiUnavailableError:
+            raise
+        except Exception as e:
+            return f"{ERROR_PREFIX}{str(e)}"
+
+    def stream_with_rag(self, question):
+        """
+        Stream a RAG answer as events: the retrieved contexts first, then
+        answer text as Gemini produces it. The upstream stream is closed
+        as soon as the answer reaches a stopping point or the consumer
+        stops iterating.
+        """
+        retrieved_contexts = self.retriever.retrieve_similar_context(question)
+
+        if not retrieved_contexts:
+            yield {"event": "contexts", "data": []}
+            yield {"event": "done", "data": {"answer": "There is no available answer"}}
+            return
+
+        top_context = retrieved_contexts[:1]
+        yield {"event": "contexts", "data": top_context}
+
+        prompt_text = generate_prompt(question, top_context)
+
+        response = self.model.generate_content(
+            prompt_text,
+            generation_config=generation_config(),
+            stream=True
+        )
+
+        truncator = StreamTruncator()
+        try:
+            for chunk in response:
+                piece = truncator.feed(chunk_text(chunk))
+                if piece:
+                    yield {"event": "token", "data": piece}
+                if truncator.done:
+                    break
+        finally:
+            # Also runs when the client disconnects and the generator is closed
+            close_stream(response)
+
+        yield {"event": "done", "data": {"answer": truncator.answer or NO_RESPONSE}}
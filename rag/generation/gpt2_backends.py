@@ -0,0 +1,117 @@
+import time
+from pathlib import Path
+
+import torch
+from transformers import AutoModelForCausalLM
+from config.settings_rag import rag_settings
+
+BACKENDS = ("pytorch", "int8", "onnx")
+
+# Short Arabic prompts used to compare a backend against the fp32 model
+PARITY_PROMPTS = [
+    "أجب على السؤال التالي بناءً على المعلومات المتاحة أدناه:\n\nالسؤال: ما هي عاصمة مصر؟\nالإجابة:",
+    "أجب على السؤال التالي بناءً على المعلومات المتاحة أدناه:\n\nالسؤال: متى ولد ألبرت أينشتاين؟\nالإجابة:",
+    "أجب على السؤال التالي بناءً على المعلومات المتاحة أدناه:\n\nالسؤال: ما هو أطول نهر في العالم؟\nالإجابة:",
+    "أجب على السؤال التالي بناءً على المعلومات المتاحة أدناه:\n\nالسؤال: من هو مؤلف كتاب الأيام؟\nالإجابة:",
+]
+
+
+def load_pytorch(model_name=rag_settings.GPT2_MODEL):
+    """Reference fp32 PyTorch model"""
+    model = AutoModelForCausalLM.from_pretrained(model_name)
+    model.eval()
+    return model
+
+
+def load_int8(model_name=rag_settings.GPT2_MODEL):
+    """PyTorch model with dynamic int8 quantization of all linear projections"""
+    model = conv1d_to_linear(load_pytorch(model_name))
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_onnx(model_name=rag_settings.GPT2_MODEL, export_dir=rag_settings.GPT2_ONNX_DIR):
+    """ONNX Runtime graph with KV cache, exported once and reused from export_dir"""
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM
+    except ImportError as e:
+        raise ImportError(
+            "The onnx GPT-2 backend requires `optimum[onnxruntime]`"
+        ) from e
+
+    export_dir = Path(export_dir)
+    if (export_dir / "config.json").exists():
+        return ORTModelForCausalLM.from_pretrained(export_dir, use_cache=True)
+
+    model = ORTModelForCausalLM.from_pretrained(model_name, export=True, use_cache=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+def load_backend(backend, model_name=rag_settings.GPT2_MODEL):
+    """Load the GPT-2 model for the given inference backend"""
+    loaders = {"pytorch": load_pytorch, "int8": load_int8, "onnx": load_onnx}
+    if backend not in loaders:
+        raise ValueError(f"Unsupported GPT-2 backend: {backend} (expected one of {BACKENDS})")
+    return loaders[backend](model_name)
+
+
+def conv1d_to_linear(model):
+    """
+    Replace GPT-2's Conv1D projections with equivalent nn.Linear layers,
+    which dynamic quantization knows how to handle.
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    for module in list(model.modules()):
+        for child_name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, child_name, linear)
+    return model
+
+
+def check_parity(candidate, reference, tokenizer, prompts=PARITY_PROMPTS,
+                 max_new_tokens=rag_settings.GPT2_MAX_TOKENS):
+    """
+    Compare a candidate backend with the fp32 reference on the same prompts.
+    Reports greedy next-token agreement over the generated continuation,
+    the share of identical answers, and mean latency of both models.
+    """
+    agreements = []
+    identical = 0
+    latencies = {"reference": [], "candidate": []}
+
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+        outputs = {}
+        for name, model in (("reference", reference), ("candidate", candidate)):
+            start = time.perf_counter()
+            with torch.no_grad():
+                output = model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    num_beams=1,
+                    pad_token_id=tokenizer.eos_token_id,
+                    eos_token_id=tokenizer.eos_token_id
+                )
+            latencies[name].append(time.perf_counter() - start)
+            outputs[name] = output[0, inputs["input_ids"].shape[1]:].tolist()
+
+        ref_tokens, cand_tokens = outputs["reference"], outputs["candidate"]
+        length = max(len(ref_tokens), len(cand_tokens), 1)
+        matching = sum(r == c for r, c in zip(ref_tokens, cand_tokens))
+        agreements.append(matching / length)
+        identical += ref_tokens == cand_tokens
+
+    return {
+        "token_agreement": sum(agreements) / len(agreements),
+        "identical_answers": identical / len(prompts),
+        "reference_latency": sum(latencies["reference"]) / len(prompts),
+        "candidate_latency": sum(latencies["candidate"]) / len(prompts),
+    }
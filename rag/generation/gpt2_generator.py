@@ -1,13 +1,44 @@
-from rag.retrieval.retrieval import Retriever
+import asyncio
+import threading
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+from rag.registry import registry
 from rag.generation.prompt import generate_prompt, truncate_answer
+from rag.generation.streaming import StreamTruncator
+from rag.generation.batch_scheduler import GenerationBatcher
 from config.settings_rag import rag_settings
 
 
+class StopOnEvent(StoppingCriteria):
+    """Stops generation once the consumer of a stream sets the event"""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],), self.event.is_set(),
+            dtype=torch.bool, device=input_ids.device
+        )
+
+
 class GPT2Generator:
-    def __init__(self, tokenizer, model):
+    def __init__(self, tokenizer, model, retriever=None):
         self.tokenizer = tokenizer
         self.model = model
-        self.retriever = Retriever()
+        self.retriever = retriever or registry.get("retriever")
+
+        # Batched prompts are left-padded so generation continues from the prompt end
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+
+        self.batcher = (
+            GenerationBatcher(self.generate_batch)
+            if rag_settings.GPT2_BATCHING_ENABLED else None
+        )
 
     def generate_with_rag(self, question):
         """Generate answer using RAG """
@@ -21,9 +52,56 @@ class GPT2Generator:
         
         prompt_text = generate_prompt(question, top_context)
 
+        return self.generate_from_prompt(prompt_text), top_context
+
+
+    def generate_without_rag(self, question):
+        """Generate answer without RAG"""
+
+        return self.generate_from_prompt(question)
+
+    async def agenerate_with_rag(self, question):
+        """Async variant of generate_with_rag; generation runs on the model executor"""
+
+        retrieved_contexts = await self.retriever.aretrieve_similar_context(question)
+
+        if not retrieved_contexts:
+            return "There is no available answer", []
+
+        top_context = retrieved_contexts[:1]
+
+        prompt_text = generate_prompt(question, top_context)
+
+        return await self.agenerate_from_prompt(prompt_text), top_context
+
+    async def agenerate_without_rag(self, question):
+        """Async variant of generate_without_rag"""
+
+        return await self.agenerate_from_prompt(question)
+
+    def generate_from_prompt(self, prompt_text):
+        """Generate the truncated answer for one prompt, batched with concurrent callers"""
+
+        if self.batcher is not None:
+            return self.batcher.generate(prompt_text)
+        return self.generate_batch([prompt_text])[0]
+
+    async def agenerate_from_prompt(self, prompt_text):
+        """Async variant of generate_from_prompt"""
+
+        if self.batcher is not None:
+            return await asyncio.wrap_future(self.batcher.submit(prompt_text))
+        return await asyncio.get_running_loop().run_in_executor(
+            registry.get("model_executor"), self.generate_from_prompt, prompt_text
+        )
+
+    def generate_batch(self, prompts):
+        """Run one beam-search generate call over left-padded prompts"""
+
         inputs = self.tokenizer(
-            prompt_text,
+            prompts,
             return_tensors="pt",
+            padding=True,
             truncation=True,
             max_length=512
         )
@@ -40,37 +118,72 @@ class GPT2Generator:
             eos_token_id=self.tokenizer.eos_token_id
         )
 
-        answer = self.tokenizer.decode(output[0], skip_special_tokens=True)
-        final_answer = answer.replace(prompt_text, "").strip()
-        final_answer = truncate_answer(final_answer)
+        # Only decode the newly generated tokens of each row
+        answers = self.tokenizer.batch_decode(
+            output[:, inputs["input_ids"].shape[1]:],
+            skip_special_tokens=True
+        )
 
-        return final_answer, top_context
+        return [truncate_answer(answer.strip()) for answer in answers]
 
+    def stream_with_rag(self, question):
+        """
+        Stream a RAG answer as events: the retrieved contexts first, then
+        answer text token by token. Streaming needs greedy decoding, since
+        transformers streamers do not support beam search.
+        """
+        retrieved_contexts = self.retriever.retrieve_similar_context(question)
 
-    def generate_without_rag(self, question):
-        """Generate answer without RAG"""
+        if not retrieved_contexts:
+            yield {"event": "contexts", "data": []}
+            yield {"event": "done", "data": {"answer": "There is no available answer"}}
+            return
+
+        top_context = retrieved_contexts[:1]
+        yield {"event": "contexts", "data": top_context}
+
+        prompt_text = generate_prompt(question, top_context)
 
         inputs = self.tokenizer(
-            question,
+            prompt_text,
             return_tensors="pt",
             truncation=True,
             max_length=512
         )
 
-        output = self.model.generate(
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        stop = threading.Event()
+
+        future = registry.get("model_executor").submit(
+            self.model.generate,
             **inputs,
             max_new_tokens=rag_settings.GPT2_MAX_TOKENS,
             no_repeat_ngram_size=rag_settings.GPT2_NO_REPEAT_NGRAM_SIZE,
             do_sample=False,
-            top_p=rag_settings.GPT2_TOP_P,
-            num_beams=rag_settings.GPT2_NUM_BEAMS,
-            temperature=rag_settings.GPT2_TEMPERATURE,
+            num_beams=1,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([StopOnEvent(stop)]),
             pad_token_id=self.tokenizer.eos_token_id,
             eos_token_id=self.tokenizer.eos_token_id
         )
+        # Unblock the consumer if generation fails before ending the stream
+        future.add_done_callback(lambda f: f.exception() is not None and streamer.end())
+
+        truncator = StreamTruncator()
+        try:
+            for text in streamer:
+                piece = truncator.feed(text)
+                if piece:
+                    yield {"event": "token", "data": piece}
+                if truncator.done:
+                    break
+        finally:
+            # Stops generation at the next step, also when the client disconnects
+            stop.set()
 
-        answer = self.tokenizer.decode(output[0], skip_special_tokens=True)
-        final_answer = answer.replace(question, "").strip()
-        final_answer = truncate_answer(final_answer)
+        if future.done() and future.exception() is not None:
+            raise future.exception()
 
-        return final_answer
+        yield {"event": "done", "data": {"answer": truncator.answer}}
@@ -1,18 +1,37 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoTokenizer
 import google.generativeai as genai
 from config.settings_rag import rag_settings  
+from rag.generation import gpt2_backends
 
 class ModelLoader:
     @staticmethod
-    def load_gpt2():
-        """Load Arabic GPT-2 model"""
+    def load_gpt2(backend=rag_settings.GPT2_BACKEND):
+        """Load Arabic GPT-2 model with the configured inference backend"""
         tokenizer = AutoTokenizer.from_pretrained(rag_settings.GPT2_MODEL)
-        model = AutoModelForCausalLM.from_pretrained(rag_settings.GPT2_MODEL)
+        model = gpt2_backends.load_backend(backend)
+
+        if backend != "pytorch" and rag_settings.GPT2_PARITY_CHECK:
+            reference = gpt2_backends.load_pytorch()
+            parity = gpt2_backends.check_parity(model, reference, tokenizer)
+            print(f"GPT-2 {backend} parity: {parity}")
+
+            if parity["token_agreement"] < rag_settings.GPT2_PARITY_MIN_AGREEMENT:
+                print(f"GPT-2 {backend} backend failed the parity check, falling back to pytorch")
+                model = reference
+
         return tokenizer, model
     
     @staticmethod
     def load_gemini():
         """Configure Gemini model"""
-        genai.configure(api_key=rag_settings.GOOGLE_API_KEY)
+        if rag_settings.GEMINI_API_ENDPOINT:
+            # The REST transport is needed to point the SDK at a custom endpoint
+            genai.configure(
+                api_key=rag_settings.GOOGLE_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": rag_settings.GEMINI_API_ENDPOINT}
+            )
+        else:
+            genai.configure(api_key=rag_settings.GOOGLE_API_KEY)
         model = genai.GenerativeModel(rag_settings.GEMINI_MODEL)
         return model
@@ -1,3 +1,16 @@
+# Natural stopping points, in priority order
+STOP_CHARS = ['.', '،', '?', '!']
+
+# Placeholders returned instead of an answer when generation failed or produced nothing
+NO_RESPONSE = "No response generated"
+ERROR_PREFIX = "Error: "
+
+
+def is_generated_answer(answer):
+    """False for empty answers and the failure placeholders above"""
+    return bool(answer) and answer != NO_RESPONSE and not answer.startswith(ERROR_PREFIX)
+
+
 def generate_prompt(question, retrieved_contexts):
     """Generate prompt """
     prompt = "أجب على السؤال التالي بناءً على المعلومات المتاحة أدناه:\n\n"
@@ -8,7 +21,7 @@ def generate_prompt(question, retrieved_contexts):
     prompt += f"\nالسؤال: {question}\nالإجابة:"
     return prompt
 
-def truncate_answer(answer, stop_chars=['.', '،', '?', '!']):
+def truncate_answer(answer, stop_chars=STOP_CHARS):
     """Truncate answer at natural stopping points"""
     if not answer:
         return answer
@@ -0,0 +1,42 @@
+from rag.generation.prompt import STOP_CHARS, truncate_answer
+
+
+class StreamTruncator:
+    """
+    Incremental counterpart of truncate_answer for token streams.
+
+    truncate_answer cuts at the highest-priority stop character present
+    in the whole answer, which a stream only knows once it has ended. The
+    text received so far is truncated the same way and only the growth of
+    that prefix is emitted: anything after a lower-priority stop
+    character is held back until a higher-priority one arrives, so the
+    streamed answer always equals the batch one. `done` is set once the
+    top-priority stop character has been seen, as nothing can follow it.
+    """
+
+    def __init__(self, stop_chars=STOP_CHARS):
+        self.stop_chars = stop_chars
+        self.received = ""
+        self.text = ""
+        self.done = False
+
+    def feed(self, chunk):
+        """Return the text that can be emitted after this chunk; sets done at the final stop"""
+        if self.done or not chunk:
+            return ""
+
+        # Leading whitespace is stripped like in the non-streaming path
+        if not self.received:
+            chunk = chunk.lstrip()
+        self.received += chunk
+
+        # Truncation only ever extends as text arrives, so text is a prefix of it
+        answer = truncate_answer(self.received, self.stop_chars)
+        piece = answer[len(self.text):]
+        self.text = answer
+        self.done = self.stop_chars[0] in self.received
+        return piece
+
+    @property
+    def answer(self):
+        return self.text.strip()
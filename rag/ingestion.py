@@ -0,0 +1,101 @@
+import json
+import time
+
+from rag.data.chunking import chunk_text
+from rag.data.text_cleaning import normalize_arabic
+from rag.registry import registry
+from rag.vector_store.base import content_hash, point_id_for, text_hash, to_numpy
+from config.settings_rag import rag_settings
+
+
+def make_document(text, metadata=None):
+    """
+    Document for ingest_many with a content-hash ID over the text and its
+    metadata: re-ingesting an identical document replaces its chunks, while
+    the same text with different metadata is stored as a separate document
+    """
+    metadata = metadata or {}
+    key = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return {"id": content_hash(text, key), "text": text, "metadata": metadata}
+
+
+class DocumentIngestor:
+    """
+    Ingestion stage for free-text documents: normalizes and splits
+    documents into sentence-aware chunks, encodes all chunks of a batch in
+    one call and upserts them together, each carrying its parent document
+    ID and chunk position.
+    """
+
+    def __init__(self, embedding_generator=None, vector_db=None,
+                 chunk_size=rag_settings.CHUNK_SIZE, overlap=rag_settings.CHUNK_OVERLAP,
+                 normalize=rag_settings.INGEST_NORMALIZE_TEXT):
+        self.embedding_generator = embedding_generator or registry.get("embedder")
+        self.vector_db = vector_db or registry.get("vector_db")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.normalize = normalize
+
+    def chunk_document(self, text):
+        """Chunks of a document's text, normalized first when configured"""
+        text = normalize_arabic(text) if self.normalize else text
+        return chunk_text(text, chunk_size=self.chunk_size, overlap=self.overlap)
+
+    def validate(self, text):
+        """
+        Raise ValueError for text that would produce no chunks: with
+        normalization on, text without Arabic content normalizes to nothing
+        """
+        if not self.chunk_document(text):
+            reason = "no Arabic content" if self.normalize else "no content"
+            raise ValueError(f"text has {reason} to index")
+
+    def ingest(self, text, metadata=None):
+        """Chunk, embed and store one document; returns its ID and chunk count"""
+        return self.ingest_many([make_document(text, metadata)])[0]
+
+    def ingest_many(self, documents):
+        """
+        Chunk, embed and store a batch of documents (dicts with `id`, `text`
+        and optional `metadata`); returns the ID and chunk count of each.
+        Documents are expected to pass `validate`; one that does not is
+        reported with 0 chunks and nothing is stored for it.
+        """
+        ids, texts, payloads, results = [], [], [], []
+        ingested_at = time.time()
+
+        for document in documents:
+            chunks = self.chunk_document(document["text"])
+
+            for index, chunk in enumerate(chunks):
+                ids.append(point_id_for(content_hash(document["id"], index)))
+                texts.append(chunk["text"])
+                payloads.append({
+                    "context": chunk["text"],
+                    "text_hash": text_hash(chunk["text"]),
+                    "metadata": document.get("metadata") or {},
+                    "ingested_at": ingested_at,
+                    "parent_id": document["id"],
+                    "chunk_index": index,
+                    "chunk_count": len(chunks),
+                    "start": chunk["start"],
+                    "end": chunk["end"],
+                })
+            results.append({"document_id": document["id"], "chunks": len(chunks)})
+
+        if not ids:
+            return results
+
+        # Ingested chunks are encoded once, so they bypass the on-disk embedding cache
+        embeddings = to_numpy(self.embedding_generator.generate_embeddings(texts, use_cache=False))
+        self.vector_db.upsert(ids, embeddings, payloads)
+
+        # Keep the lexical index in sync with the vector store
+        if registry.is_loaded("bm25_index"):
+            registry.get("bm25_index").add(ids, texts)
+
+        # Cached answers that the new chunks would now outrank are stale
+        if registry.is_loaded("answer_cache"):
+            registry.get("answer_cache").invalidate_for_vectors(embeddings)
+
+        return results
@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from config.settings_rag import rag_settings
+
+
+class IngestJobQueue:
+    """
+    Persistent queue of bulk ingestion jobs in a local SQLite database.
+
+    A job's raw NDJSON records are stored as they are uploaded, so large
+    uploads are never held in memory and queued or half-finished jobs
+    survive a restart. Workers claim jobs atomically, which makes it safe
+    for several server processes to share one queue file.
+    """
+
+    UPLOAD_BATCH = 1000
+
+    def __init__(self, path=rag_settings.INGEST_QUEUE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    chunks INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS records (
+                    job_id TEXT NOT NULL,
+                    line INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (job_id, line)
+                );
+                CREATE TABLE IF NOT EXISTS record_errors (
+                    job_id TEXT NOT NULL,
+                    line INTEGER NOT NULL,
+                    error TEXT NOT NULL
+                );
+            """)
+
+            # Queue files created before retries were added lack these columns
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (("attempts", "INTEGER NOT NULL DEFAULT 0"),
+                                       ("available_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+
+    def create_job(self, lines):
+        """
+        Store the non-empty lines of an upload as a new queued job; returns
+        the job ID. An upload without records is stored as a failed job.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, created_at) VALUES (?, 'uploading', ?)",
+                (job_id, time.time())
+            )
+
+        total = 0
+        batch = []
+        try:
+            for line in lines:
+                if isinstance(line, bytes):
+                    line = line.decode("utf-8")
+                line = line.strip()
+                if not line:
+                    continue
+                batch.append((job_id, total, line))
+                total += 1
+                if len(batch) >= self.UPLOAD_BATCH:
+                    self._insert_records(batch)
+                    batch = []
+            self._insert_records(batch)
+        except Exception as e:
+            self._finish(job_id, "failed", error=f"upload failed: {e}")
+            raise
+
+        if total == 0:
+            self._finish(job_id, "failed", error="upload contained no records")
+            return job_id
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', total = ? WHERE id = ?", (total, job_id)
+            )
+        return job_id
+
+    def _insert_records(self, rows):
+        if rows:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO records (job_id, line, data) VALUES (?, ?, ?)", rows
+                )
+
+    def claim_next(self, stale_after=rag_settings.INGEST_JOB_STALE_SECONDS):
+        """
+        Claim the oldest queued job whose retry delay has passed, or a
+        running job whose worker stopped sending heartbeats; returns the
+        job or None
+        """
+        now = time.time()
+        claimable = """(status = 'queued' AND COALESCE(available_at, 0) <= ?)
+                       OR (status = 'running' AND heartbeat_at < ?)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT id FROM jobs WHERE {claimable} ORDER BY created_at LIMIT 1",
+                (now, now - stale_after)
+            ).fetchone()
+            if row is None:
+                return None
+
+            claimed = self._conn.execute(
+                f"""UPDATE jobs SET status = 'running', heartbeat_at = ?,
+                   started_at = COALESCE(started_at, ?)
+                   WHERE id = ? AND ({claimable})""",
+                (now, now, row[0], now, now - stale_after)
+            ).rowcount
+        return self.get(row[0]) if claimed else None
+
+    def pending_records(self, job_id, batch_size):
+        """Yield batches of (line, data) not yet processed, in upload order"""
+        offset = self.get(job_id)["processed"]
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT line, data FROM records WHERE job_id = ? AND line >= ? ORDER BY line LIMIT ?",
+                    (job_id, offset, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            offset = rows[-1][0] + 1
+
+    def record_progress(self, job_id, processed, failed, chunks, errors):
+        """Commit one processed batch: counters, per-record errors and a heartbeat"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE jobs SET processed = processed + ?, failed = failed + ?,
+                   chunks = chunks + ?, heartbeat_at = ? WHERE id = ?""",
+                (processed, failed, chunks, time.time(), job_id)
+            )
+            self._conn.executemany(
+                "INSERT INTO record_errors (job_id, line, error) VALUES (?, ?, ?)",
+                [(job_id, line, error) for line, error in errors]
+            )
+
+    def heartbeat(self, job_id):
+        """Mark a running job as alive so it is not reclaimed as stale"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+
+    def defer(self, job_id, error, delay):
+        """
+        Requeue a job after an infrastructure error. Progress committed so
+        far is kept, so the next claim resumes after the last full batch.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE jobs SET status = 'queued', attempts = attempts + 1,
+                   available_at = ?, error = ? WHERE id = ?""",
+                (time.time() + delay, error, job_id)
+            )
+
+    def complete(self, job_id):
+        self._finish(job_id, "completed")
+
+    def fail(self, job_id, error):
+        self._finish(job_id, "failed", error=error)
+
+    def _finish(self, job_id, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+            # Raw records are only needed until the job is done
+            self._conn.execute("DELETE FROM records WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id):
+        """Job row as a dict, or None"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([c[0] for c in cursor.description], row))
+
+    def errors(self, job_id, limit=rag_settings.INGEST_MAX_REPORTED_ERRORS):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT line, error FROM record_errors WHERE job_id = ? ORDER BY line LIMIT ?",
+                (job_id, limit)
+            ).fetchall()
+        # Report 1-based line numbers of the upload
+        return [{"line": line + 1, "error": error} for line, error in rows]
+
+    def status(self, job_id):
+        """Progress report for the job status endpoint"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        end = job["finished_at"] or time.time()
+        elapsed = end - job["started_at"] if job["started_at"] else 0.0
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "total": job["total"],
+            "processed": job["processed"],
+            "failed": job["failed"],
+            "chunks": job["chunks"],
+            "attempts": job["attempts"],
+            "progress": job["processed"] / job["total"] if job["total"] else 0.0,
+            "elapsed_seconds": elapsed,
+            "records_per_second": job["processed"] / elapsed if elapsed > 0 else 0.0,
+            "error": job["error"],
+            "errors": self.errors(job_id),
+        }
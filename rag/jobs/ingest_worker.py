@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from rag.registry import registry
+from config.settings_rag import rag_settings
+
+
+def parse_record(data):
+    """Validate one NDJSON record; returns a document dict or raises ValueError"""
+    try:
+        record = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+
+    text = record.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("text is required")
+
+    metadata = record.get("metadata", {})
+    if not isinstance(metadata, dict):
+        raise ValueError("metadata must be an object")
+
+    return {"id": record.get("id"), "text": text, "metadata": metadata}
+
+
+class IngestWorker:
+    """
+    Background thread that drains the ingestion job queue.
+
+    Records are processed in batches: each batch is validated, chunked,
+    encoded in one call and upserted in one request by the DocumentIngestor,
+    then its progress is committed to the queue. Document IDs default to
+    the job ID and line number, so a batch replayed after a crash
+    overwrites its own points instead of duplicating them.
+
+    Only invalid records are failed one by one. An error from encoding or
+    the vector store stops the job without committing the batch; the job
+    is requeued with exponential backoff and resumes from its last
+    committed batch, up to INGEST_JOB_MAX_ATTEMPTS attempts.
+
+    While a job is processed a side thread keeps its heartbeat fresh, so
+    a slow batch is not mistaken for a dead worker and claimed twice.
+    """
+
+    def __init__(self, job_queue=None, warmup=None,
+                 batch_size=rag_settings.INGEST_BATCH_SIZE,
+                 poll_interval=rag_settings.INGEST_POLL_INTERVAL):
+        self.job_queue = job_queue
+        self.warmup = warmup
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def ensure_started(self):
+        """Start the worker thread once per process"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Wake the worker up after a job has been queued"""
+        self.ensure_started()
+        self._wakeup.set()
+
+    def _run(self):
+        self.job_queue = self.job_queue or registry.get("ingest_queue")
+
+        # The collection must exist before anything is upserted
+        while self.warmup is not None:
+            try:
+                self.warmup()
+                break
+            except Exception as e:
+                print(f"Ingest worker warmup failed, retrying: {e}")
+                time.sleep(rag_settings.INGEST_JOB_STALE_SECONDS / 10)
+
+        while True:
+            job = self.job_queue.claim_next()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                with self._heartbeat(job["id"]):
+                    self.process(job)
+                self.job_queue.complete(job["id"])
+            except Exception as e:
+                self.retry_or_fail(job, e)
+
+    @contextmanager
+    def _heartbeat(self, job_id, interval=rag_settings.INGEST_JOB_STALE_SECONDS / 5):
+        """Refresh the job's heartbeat from a side thread until the block exits"""
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(interval):
+                try:
+                    self.job_queue.heartbeat(job_id)
+                except Exception as e:
+                    print(f"Ingest job {job_id} heartbeat failed: {e}")
+
+        thread = threading.Thread(target=beat, name=f"ingest-heartbeat-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def retry_or_fail(self, job, error):
+        """Requeue a job interrupted by an infrastructure error, or fail it when out of attempts"""
+        attempts = job["attempts"] + 1
+        if attempts >= rag_settings.INGEST_JOB_MAX_ATTEMPTS:
+            print(f"Ingest job {job['id']} failed after {attempts} attempts: {error}")
+            self.job_queue.fail(job["id"], str(error))
+            return
+
+        delay = min(
+            rag_settings.INGEST_RETRY_MAX_DELAY,
+            rag_settings.INGEST_RETRY_BASE_DELAY * 2 ** (attempts - 1)
+        )
+        print(f"Ingest job {job['id']} interrupted, retrying in {delay:.0f}s: {error}")
+        self.job_queue.defer(job["id"], f"attempt {attempts} failed: {error}", delay)
+
+    def process(self, job):
+        ingestor = registry.get("ingestor")
+        for rows in self.job_queue.pending_records(job["id"], self.batch_size):
+            started = time.perf_counter()
+            documents, errors = [], []
+            for line, data in rows:
+                try:
+                    document = parse_record(data)
+                    ingestor.validate(document["text"])
+                except ValueError as e:
+                    errors.append((line, str(e)))
+                    continue
+                if document["id"] is None:
+                    document["id"] = f"{job['id']}:{line}"
+                documents.append(document)
+
+            chunks = 0
+            if documents:
+                # Encode or upsert errors propagate: the batch stays uncommitted and is retried
+                results = ingestor.ingest_many(documents)
+                chunks = sum(result["chunks"] for result in results)
+
+            self.job_queue.record_progress(
+                job["id"],
+                processed=len(rows),
+                failed=len(rows) - len(documents),
+                chunks=chunks,
+                errors=errors
+            )
+            print(f"Ingest job {job['id']}: {len(rows)} records in "
+                  f"{time.perf_counter() - started:.2f}s ({chunks} chunks)")
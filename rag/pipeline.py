@@ -1,11 +1,7 @@
 from rag.data.data_loader import load_arcd_dataset
 from rag.data.text_cleaning import clean_dataframe
-from rag.embeddings.embeddings import EmbeddingGenerator
-from rag.vector_store.qdrant_store import VectorDB
-from rag.generation.models_loader import ModelLoader
-from rag.generation.gpt2_generator import GPT2Generator
-from rag.generation.gemini_generator import GeminiGenerator
-from rag.retrieval.retrieval import Retriever
+from rag.registry import registry, format_memory_report
+from config.settings_rag import rag_settings
 
 class RAGPipeline:
     def __init__(self):
@@ -29,46 +25,102 @@ class RAGPipeline:
         self.df_val = clean_dataframe(self.df_val)
         
         print("Initializing embedding generator...")
-        self.embedding_generator = EmbeddingGenerator()
-        
-        print("Generating embeddings for data...")
-        train_embeddings = self.embedding_generator.generate_embeddings(
-            self.df_train["context"].tolist()
-        )
-        val_embeddings = self.embedding_generator.generate_embeddings(
-            self.df_val["context"].tolist()
-        )
+        self.embedding_generator = registry.get("embedder")
         
         print("Initializing vector database...")
-        self.qdrant_store = VectorDB()
-        self.qdrant_store.create_collection(train_embeddings.shape[1])
-        
-        print("Inserting documents into vector database...")
-        insertion_result = self.qdrant_store.insert_all_samples(
-            self.df_train, train_embeddings,
-            self.df_val, val_embeddings
-        )
-        
-        print(f"Inserted {insertion_result['total']} documents total "
-              f"({insertion_result['train']['count']} train, "
-              f"{insertion_result['val']['count']} validation)")
-        
-        print("Loading models...")
-        gpt2_tokenizer, gpt2_model = ModelLoader.load_gpt2()
-        gemini_model = ModelLoader.load_gemini()
-        
-        print("Initializing generators...")
-        self.gpt2_generator = GPT2Generator(gpt2_tokenizer, gpt2_model)
-        self.gemini_generator = GeminiGenerator(gemini_model)
+        self.qdrant_store = registry.get("vector_db")
+        vector_size = self.embedding_generator.model.get_sentence_embedding_dimension()
+        if self.qdrant_store.ensure_collection(vector_size, rebuild=rag_settings.REBUILD_INDEX):
+            print("Created a fresh collection")
+
+        print("Syncing documents with vector database...")
+        sync_result = self.sync_index()
+
+        print(f"Inserted {sync_result['inserted']['total']} documents total "
+              f"({sync_result['inserted']['train']['count']} train, "
+              f"{sync_result['inserted']['val']['count']} validation), "
+              f"deleted {sync_result['deleted']} stale, "
+              f"{sync_result['unchanged']} unchanged, "
+              f"restored {sync_result['restored']} missing documents")
         
         print("Initializing retriever...")
-        self.retriever = Retriever()
+        self.retriever = registry.get("retriever")
+        
+        print("Loading models and initializing generators...")
+        self.gpt2_generator = registry.get("gpt2_generator")
+        self.gemini_generator = registry.get("gemini_generator")
         
         self.initialized = True
         print("Pipeline initialization complete!")
+        print("Component memory:\n" + format_memory_report(registry.memory_report()))
         
         return self
     
+    def sync_index(self):
+        """Upsert only new or changed contexts and delete stale ones"""
+        existing_ids = self.qdrant_store.existing_point_ids(splits=["train", "val"])
+
+        train_contexts = self.qdrant_store.group_contexts(self.df_train, "train")
+        val_contexts = self.qdrant_store.group_contexts(self.df_val, "val")
+        train_ids = train_contexts["point_id"].tolist()
+        val_ids = val_contexts["point_id"].tolist()
+
+        new_train = train_contexts[~train_contexts["point_id"].isin(existing_ids)].reset_index(drop=True)
+        new_val = val_contexts[~val_contexts["point_id"].isin(existing_ids)].reset_index(drop=True)
+
+        print("Generating embeddings for new data...")
+        train_embeddings = self.embedding_generator.generate_embeddings(
+            new_train["context"].tolist()
+        )
+        val_embeddings = self.embedding_generator.generate_embeddings(
+            new_val["context"].tolist()
+        )
+
+        cache_stats = self.embedding_generator.cache_stats()
+        if cache_stats is not None:
+            print(f"Embedding cache: {cache_stats['hits']} hits, "
+                  f"{cache_stats['misses']} misses "
+                  f"({cache_stats['entries']} entries in {cache_stats['segments']} segments)")
+            if cache_stats["segments"] > rag_settings.EMBEDDING_CACHE_MAX_SEGMENTS:
+                self.embedding_generator.cache.compact()
+
+        inserted = self.qdrant_store.insert_all_samples(
+            new_train, train_embeddings,
+            new_val, val_embeddings
+        )
+
+        stale_ids = existing_ids - set(train_ids) - set(val_ids)
+        self.qdrant_store.delete_points(stale_ids)
+
+        # The document store is local: it can lack text for points that already
+        # exist in the vector store (lost file, or a collection shared across hosts)
+        restored = 0
+        for contexts, split in ((train_contexts, "train"), (val_contexts, "val")):
+            present = contexts[contexts["point_id"].isin(existing_ids)]
+            missing = self.qdrant_store.missing_documents(present["point_id"].tolist())
+            if missing:
+                rows = present[present["point_id"].isin(missing)]
+                self.qdrant_store.restore_documents(
+                    rows["point_id"].tolist(), self.qdrant_store.context_payloads(rows, split)
+                )
+                restored += len(rows)
+
+        # A BM25 index built before this sync must follow the same changes
+        if registry.is_loaded("bm25_index"):
+            bm25_index = registry.get("bm25_index")
+            bm25_index.add(
+                new_train["point_id"].tolist() + new_val["point_id"].tolist(),
+                new_train["context"].tolist() + new_val["context"].tolist()
+            )
+            bm25_index.remove(stale_ids)
+
+        return {
+            "inserted": inserted,
+            "deleted": len(stale_ids),
+            "unchanged": len(existing_ids) - len(stale_ids),
+            "restored": restored,
+        }
+
     def generate_answer(self, question, model="gpt2", use_rag=True):
         """Generate answer using specified model"""
         if not self.initialized:
@@ -85,4 +137,20 @@ class RAGPipeline:
             else:
                 return self.gemini_generator.generate_without_rag(question)
         else:
-            raise ValueError(f"Unsupported model: {model}")
\ No newline at end of file
+            raise ValueError(f"Unsupported model: {model}")
+
+    async def agenerate_answer(self, question, model="gpt2", use_rag=True):
+        """Async variant of generate_answer"""
+        if not self.initialized:
+            raise RuntimeError("Pipeline not initialized. Call initialize_pipeline() first.")
+
+        if model.lower() == "gpt2":
+            generator = self.gpt2_generator
+        elif model.lower() == "gemini":
+            generator = self.gemini_generator
+        else:
+            raise ValueError(f"Unsupported model: {model}")
+
+        if use_rag:
+            return await generator.agenerate_with_rag(question)
+        return await generator.agenerate_without_rag(question)
\ No newline at end of file
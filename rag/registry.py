@@ -0,0 +1,230 @@
+import atexit
+import os
+import resource
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ComponentRegistry:
+    """
+    Process-wide registry of shared components.
+
+    Components are built lazily on first access through their registered
+    factory, so each model and client exists at most once per process no
+    matter how many retrievers, generators and evaluators ask for it.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._components = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """Register (or replace) the factory used to build a component"""
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name):
+        """Return the shared component, building it on first use"""
+        component = self._components.get(name)
+        if component is not None:
+            return component
+
+        with self._lock:
+            if name not in self._components:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown component: {name}")
+                self._components[name] = self._factories[name]()
+            return self._components[name]
+
+    def set(self, name, component):
+        """Install an already built component"""
+        with self._lock:
+            self._components[name] = component
+
+    def is_loaded(self, name):
+        return name in self._components
+
+    def reset(self, name=None):
+        """Drop one or all built components so they are rebuilt on next access"""
+        with self._lock:
+            if name is None:
+                self._components.clear()
+            else:
+                self._components.pop(name, None)
+
+    def memory_report(self):
+        """Approximate memory held by each loaded component, plus process RSS"""
+        with self._lock:
+            components = dict(self._components)
+
+        # Models shared between components are only counted for the first owner
+        seen = set()
+        report = {
+            name: estimate_memory(component, seen)
+            for name, component in components.items()
+        }
+        report["process_rss"] = process_rss_bytes()
+        return report
+
+
+def estimate_memory(component, seen=None):
+    """Bytes held by the tensors of a model, or the shallow size of other objects"""
+    seen = set() if seen is None else seen
+    if id(component) in seen:
+        return 0
+    seen.add(id(component))
+
+    if isinstance(component, (tuple, list)):
+        return sum(estimate_memory(c, seen) for c in component)
+
+    if hasattr(component, "parameters") and hasattr(component, "buffers"):
+        return sum(
+            t.numel() * t.element_size()
+            for t in list(component.parameters()) + list(component.buffers())
+        )
+
+    # Wrappers such as EmbeddingGenerator hold their model in an attribute
+    model = getattr(component, "model", None)
+    if model is not None and hasattr(model, "parameters"):
+        return estimate_memory(model, seen)
+
+    return sys.getsizeof(component)
+
+
+def process_rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_memory_report(report):
+    """Human-readable one-line-per-component memory report"""
+    return "\n".join(
+        f"  {name}: {size / 1024 ** 2:.1f} MB" for name, size in report.items()
+    )
+
+
+def _build_model_executor():
+    from config.settings_rag import rag_settings
+    return ThreadPoolExecutor(
+        max_workers=rag_settings.MODEL_EXECUTOR_WORKERS,
+        thread_name_prefix="model"
+    )
+
+
+def _build_embedder():
+    from rag.embeddings.embeddings import EmbeddingGenerator
+    return EmbeddingGenerator()
+
+
+def _build_vector_db():
+    from config.settings_rag import rag_settings
+    if rag_settings.VECTOR_STORE == "embedded":
+        from rag.vector_store.embedded_store import EmbeddedVectorStore
+        return EmbeddedVectorStore()
+
+    from rag.vector_store.qdrant_store import VectorDB
+    return VectorDB()
+
+
+def _build_query_cache():
+    from rag.embeddings.query_cache import QueryEmbeddingCache
+    return QueryEmbeddingCache()
+
+
+def _build_bm25_index():
+    from rag.retrieval.bm25 import BM25Index
+    return BM25Index.from_vector_store(registry.get("vector_db"))
+
+
+def _build_retriever():
+    from rag.retrieval.retrieval import Retriever
+    return Retriever(
+        embedding_generator=registry.get("embedder"),
+        vector_db=registry.get("vector_db"),
+        query_cache=registry.get("query_cache")
+    )
+
+
+def _build_ingestor():
+    from rag.ingestion import DocumentIngestor
+    return DocumentIngestor(
+        embedding_generator=registry.get("embedder"),
+        vector_db=registry.get("vector_db")
+    )
+
+
+def _build_ingest_buffer():
+    from config.settings_rag import rag_settings
+    from rag.batching import MicroBatcher
+    # Write-behind buffer: coalesces concurrent single-document ingests
+    buffer = MicroBatcher(
+        registry.get("ingestor").ingest_many,
+        name="ingest",
+        max_batch_size=rag_settings.INGEST_BUFFER_MAX_DOCUMENTS,
+        max_wait_ms=rag_settings.INGEST_BUFFER_MAX_WAIT_MS
+    )
+    # Flush accepted documents on interpreter shutdown (graceful worker exit)
+    atexit.register(buffer.close)
+    return buffer
+
+
+def _build_ingest_queue():
+    from rag.jobs.ingest_queue import IngestJobQueue
+    return IngestJobQueue()
+
+
+def _build_answer_cache():
+    from rag.generation.answer_cache import SemanticAnswerCache
+    return SemanticAnswerCache()
+
+
+def _build_gpt2_model():
+    from rag.generation.models_loader import ModelLoader
+    return ModelLoader.load_gpt2()
+
+
+def _build_gemini_model():
+    from rag.generation.models_loader import ModelLoader
+    return ModelLoader.load_gemini()
+
+
+def _build_gemini_client():
+    from rag.generation.gemini_client import GeminiClient
+    return GeminiClient(registry.get("gemini_model"))
+
+
+def _build_gpt2_generator():
+    from rag.generation.gpt2_generator import GPT2Generator
+    tokenizer, model = registry.get("gpt2_model")
+    return GPT2Generator(tokenizer, model, retriever=registry.get("retriever"))
+
+
+def _build_gemini_generator():
+    from rag.generation.gemini_generator import GeminiGenerator
+    return GeminiGenerator(registry.get("gemini_client"), retriever=registry.get("retriever"))
+
+
+registry = ComponentRegistry()
+registry.register("model_executor", _build_model_executor)
+registry.register("embedder", _build_embedder)
+registry.register("vector_db", _build_vector_db)
+registry.register("query_cache", _build_query_cache)
+registry.register("bm25_index", _build_bm25_index)
+registry.register("retriever", _build_retriever)
+registry.register("ingestor", _build_ingestor)
+registry.register("ingest_buffer", _build_ingest_buffer)
+registry.register("ingest_queue", _build_ingest_queue)
+registry.register("answer_cache", _build_answer_cache)
+registry.register("gpt2_model", _build_gpt2_model)
+registry.register("gemini_model", _build_gemini_model)
+registry.register("gemini_client", _build_gemini_client)
+registry.register("gpt2_generator", _build_gpt2_generator)
+registry.register("gemini_generator", _build_gemini_generator)
@@ -0,0 +1,226 @@
+import re
+import threading
+import time
+from array import array
+
+import numpy as np
+from rag.data.text_cleaning import normalize_arabic
+from config.settings_rag import rag_settings
+
+TOKEN_PATTERN = re.compile(r"[ء-ي٠-٩0-9]+")
+
+# Orthographic variants that are used interchangeably in Arabic text, and tatweel
+LETTER_VARIANTS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ة": "ه", "ى": "ي", "ـ": ""})
+
+
+def tokenize(text):
+    """Lexical tokens of normalize_arabic-normalized text"""
+    return TOKEN_PATTERN.findall(normalize_arabic(text).translate(LETTER_VARIANTS))
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over point payloads.
+
+    Postings are array-backed: for every term a compact array of document
+    numbers and a parallel array of term frequencies. Documents are keyed
+    by point ID so the index can follow upserts and deletes on the vector
+    store; IDs are returned in the type they were added with, so integer
+    point IDs stay integers. Removed documents are tombstoned and the
+    postings are compacted once they make up a quarter of the index.
+
+    The index lives in each process. Documents ingested through this
+    process are added directly; `refresh` picks up points that other
+    processes ingested (write-behind buffer or bulk job worker) by their
+    `ingested_at` watermark. Deletes made by other processes are not seen
+    until the index is rebuilt.
+    """
+
+    def __init__(self, k1=rag_settings.BM25_K1, b=rag_settings.BM25_B):
+        self.k1 = k1
+        self.b = b
+
+        self._terms = {}
+        self._postings_docs = []
+        self._postings_tfs = []
+        self._df = array("I")
+
+        self._doc_ids = []
+        self._doc_numbers = {}
+        self._doc_lengths = array("I")
+        self._doc_terms = []
+        self._alive = bytearray()
+        self._live_count = 0
+        self._total_length = 0
+
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._watermark = 0.0
+        self._refreshed_at = 0.0
+
+    @classmethod
+    def from_vector_store(cls, vector_db, **kwargs):
+        """Build the index from every point currently in the vector store"""
+        index = cls(**kwargs)
+        started = time.time()
+        ids, texts = [], []
+        for point_id, payload in vector_db.iter_points():
+            ids.append(point_id)
+            texts.append(payload_text(payload))
+        index.add(ids, texts)
+        index._watermark = started - rag_settings.BM25_REFRESH_OVERLAP
+        index._refreshed_at = started
+        return index
+
+    def refresh(self, vector_db, interval=rag_settings.BM25_REFRESH_INTERVAL):
+        """
+        Index points ingested since the last refresh that are not indexed
+        yet; runs at most once per interval and never blocks a second
+        caller. Returns the number of documents added.
+        """
+        started = time.time()
+        if started - self._refreshed_at < interval or not self._refresh_lock.acquire(blocking=False):
+            return 0
+
+        try:
+            self._refreshed_at = started
+            ids, texts = [], []
+            for point_id, payload in vector_db.iter_points_since(self._watermark):
+                if str(point_id) not in self._doc_numbers:
+                    ids.append(point_id)
+                    texts.append(payload_text(payload))
+            self.add(ids, texts)
+            # An ingest stamps its chunks before they are written, so re-scan a window
+            self._watermark = started - rag_settings.BM25_REFRESH_OVERLAP
+            return len(ids)
+        except Exception as e:
+            print(f"BM25 refresh failed, keeping the current index: {e}")
+            return 0
+        finally:
+            self._refresh_lock.release()
+
+    def __len__(self):
+        return self._live_count
+
+    def add(self, ids, texts):
+        """Index (or re-index) documents"""
+        with self._lock:
+            self.remove([i for i in ids if str(i) in self._doc_numbers])
+
+            for point_id, text in zip(ids, texts):
+                tokens = tokenize(text)
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+
+                doc = len(self._doc_ids)
+                term_ids = array("I")
+                for token, tf in counts.items():
+                    term = self._terms.get(token)
+                    if term is None:
+                        term = self._terms[token] = len(self._postings_docs)
+                        self._postings_docs.append(array("I"))
+                        self._postings_tfs.append(array("H"))
+                        self._df.append(0)
+                    self._postings_docs[term].append(doc)
+                    self._postings_tfs[term].append(min(tf, 65535))
+                    self._df[term] += 1
+                    term_ids.append(term)
+
+                self._doc_ids.append(point_id)
+                self._doc_numbers[str(point_id)] = doc
+                self._doc_lengths.append(len(tokens))
+                self._doc_terms.append(term_ids)
+                self._alive.append(1)
+                self._live_count += 1
+                self._total_length += len(tokens)
+
+    def remove(self, ids):
+        """Drop documents from the index"""
+        with self._lock:
+            for point_id in ids:
+                doc = self._doc_numbers.pop(str(point_id), None)
+                if doc is None:
+                    continue
+                for term in self._doc_terms[doc]:
+                    self._df[term] -= 1
+                self._doc_terms[doc] = array("I")
+                self._alive[doc] = 0
+                self._live_count -= 1
+                self._total_length -= self._doc_lengths[doc]
+
+            if len(self._doc_ids) - self._live_count > len(self._doc_ids) // 4:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite postings without tombstoned documents"""
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive) - 1
+
+        for term, docs in enumerate(self._postings_docs):
+            docs = np.frombuffer(docs, dtype=np.uint32)
+            keep = alive[docs]
+            tfs = np.frombuffer(self._postings_tfs[term], dtype=np.uint16)
+            self._postings_docs[term] = array("I", remap[docs[keep]].astype(np.uint32).tobytes())
+            self._postings_tfs[term] = array("H", tfs[keep].tobytes())
+
+        keep_docs = np.flatnonzero(alive)
+        self._doc_ids = [self._doc_ids[d] for d in keep_docs]
+        self._doc_numbers = {str(point_id): doc for doc, point_id in enumerate(self._doc_ids)}
+        self._doc_lengths = array("I", (self._doc_lengths[d] for d in keep_docs))
+        self._doc_terms = [self._doc_terms[d] for d in keep_docs]
+        self._alive = bytearray(b"\x01" * len(keep_docs))
+
+    def search(self, query, limit=rag_settings.TOP_K_RETRIEVAL):
+        """Top documents for a query as (point_id, bm25_score) pairs"""
+        with self._lock:
+            # Without any indexed tokens nothing can match (and the average length is 0)
+            if not self._live_count or not self._total_length:
+                return []
+
+            doc_count = len(self._doc_ids)
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / self._live_count))
+            scores = np.zeros(doc_count, dtype=np.float32)
+
+            for token in set(tokenize(query)):
+                term = self._terms.get(token)
+                if term is None or not self._df[term]:
+                    continue
+                df = self._df[term]
+                idf = np.log(1 + (self._live_count - df + 0.5) / (df + 0.5))
+                docs = np.frombuffer(self._postings_docs[term], dtype=np.uint32)
+                tfs = np.frombuffer(self._postings_tfs[term], dtype=np.uint16).astype(np.float32)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+
+            scores[np.frombuffer(bytes(self._alive), dtype=np.uint8) == 0] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+
+            k = min(limit, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self._doc_ids[d], float(scores[d])) for d in top]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": self._live_count,
+                "terms": len(self._terms),
+                "postings": sum(len(p) for p in self._postings_docs),
+            }
+
+
+def payload_text(payload):
+    """Indexed text of a point payload"""
+    return payload.get("context") or payload.get("text", "")
+
+
+def reciprocal_rank_fusion(rankings, k=rag_settings.RRF_K):
+    """Fuse ranked ID lists; returns {id: score} ordered by descending score"""
+    scores = {}
+    for ranking in rankings:
+        for rank, point_id in enumerate(ranking):
+            scores[point_id] = scores.get(point_id, 0.0) + 1.0 / (k + rank + 1)
+    return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
@@ -1,60 +1,284 @@
-from rag.embeddings.embeddings import EmbeddingGenerator
-from rag.vector_store.qdrant_store import VectorDB
+import asyncio
+import time
+
+import numpy as np
+from rag.data.text_cleaning import normalize_arabic
+from rag.registry import registry
+from rag.data.chunking import merge_adjacent_chunks
+from rag.retrieval.bm25 import reciprocal_rank_fusion
+from rag.retrieval.retrieved_context import RetrievedContext
+from rag.telemetry import telemetry
+from rag.vector_store.base import SearchHit
 from config.settings_rag import rag_settings
 
 
 class Retriever:
-    def __init__(self):
-        self.embedding_generator = EmbeddingGenerator()
-        self.vector_db = VectorDB()
+    def __init__(self, embedding_generator=None, vector_db=None, query_cache=None, bm25_index=None):
+        self.embedding_generator = embedding_generator or registry.get("embedder")
+        self.vector_db = vector_db or registry.get("vector_db")
+        self.query_cache = query_cache or registry.get("query_cache")
         self.similarity_threshold = rag_settings.SIMILARITY_THRESHOLD
 
+        # BM25 is only used when hybrid retrieval is enabled
+        if bm25_index is None and rag_settings.HYBRID_RETRIEVAL:
+            bm25_index = registry.get("bm25_index")
+        self.bm25_index = bm25_index
+
+    @staticmethod
+    def normalize_query(query):
+        """Normalize a query the same way indexed contexts were cleaned"""
+        # Queries with no Arabic content would normalize to nothing
+        return normalize_arabic(query) or str(query).strip()
+
+    def embed_query(self, query):
+        """Embedding of the normalized query, served from the LRU cache when possible"""
+        return self.query_cache.get_or_compute(
+            self.normalize_query(query),
+            self.embedding_generator.generate_single_embedding
+        )
+
+    def embed_queries(self, queries):
+        """Embeddings for many queries: cache hits first, misses encoded in one batch"""
+        normalized = [self.normalize_query(q) for q in queries]
+        embeddings = [self.query_cache.get(q) for q in normalized]
+
+        missing = list(dict.fromkeys(
+            q for q, emb in zip(normalized, embeddings) if emb is None
+        ))
+        if missing:
+            encoded = dict(zip(
+                missing,
+                self.embedding_generator.generate_query_embeddings(missing)
+            ))
+            for q, emb in encoded.items():
+                self.query_cache.put(q, emb)
+            embeddings = [
+                emb if emb is not None else encoded[q]
+                for q, emb in zip(normalized, embeddings)
+            ]
+
+        return embeddings
+
     def retrieve_similar_context(self, query, top_k=None):
         """Retrieve similar contexts for a query"""
 
         if top_k is None:
             top_k = rag_settings.TOP_K_RETRIEVAL
 
-        query_embedding = self.embedding_generator.generate_single_embedding(query)
-        search_results = self.vector_db.client.query_points(
-            collection_name=self.vector_db.collection_name,
-            query=query_embedding,
-            limit=top_k * 3
+        started = time.perf_counter()
+        query_embedding = self.embed_query(query)
+        telemetry.observe("retrieval.embed_seconds", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        search_results = self.vector_db.search(query_embedding, limit=top_k)
+        telemetry.observe("retrieval.dense_seconds", time.perf_counter() - started)
+
+        top_results = self.select_contexts(
+            *self.fuse(query, query_embedding, search_results.points, top_k), top_k
         )
+        
+        if not top_results:
+            print("There are no similar paragraphs for this question.")
+            return []
 
-        unique_contexts = {}
-        for result in search_results.points:
-            score = result.score
-            
-            if score < self.similarity_threshold:
-                continue
-            
-            context = result.payload.get("context")
-            if context is None:
-                context = result.payload.get("text", "")
+        return top_results
 
-            if not context:
-                continue
+    async def aembed_query(self, query):
+        """Async variant of embed_query; encoding runs on the model executor"""
+        normalized = self.normalize_query(query)
+        embedding = self.query_cache.get(normalized)
+        if embedding is None:
+            embedding = await asyncio.get_running_loop().run_in_executor(
+                registry.get("model_executor"),
+                self.embedding_generator.generate_single_embedding,
+                normalized
+            )
+            self.query_cache.put(normalized, embedding)
+        return embedding
+
+    async def aretrieve_similar_context(self, query, top_k=None):
+        """Async variant of retrieve_similar_context"""
 
-            answer = result.payload.get("answer_text", "")
+        if top_k is None:
+            top_k = rag_settings.TOP_K_RETRIEVAL
 
-            if context not in unique_contexts or score > unique_contexts[context]["score"]:
-                unique_contexts[context] = {
-                    "context": context,
-                    "answer": answer,
-                    "score": score,
-                    "payload": result.payload
-                }
+        started = time.perf_counter()
+        query_embedding = await self.aembed_query(query)
+        telemetry.observe("retrieval.embed_seconds", time.perf_counter() - started)
 
-        sorted_results = sorted(
-            unique_contexts.values(),
-            key=lambda x: x["score"],
-            reverse=True
+        started = time.perf_counter()
+        search_results = await self.vector_db.asearch(query_embedding, limit=top_k)
+        telemetry.observe("retrieval.dense_seconds", time.perf_counter() - started)
+
+        # Fusion, chunk merging and text loading read Qdrant and the document store
+        top_results = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.load_contexts(self.select_contexts(
+                *self.fuse(query, query_embedding, search_results.points, top_k), top_k
+            ))
         )
-        top_results = sorted_results[:top_k]
-        
+
         if not top_results:
             print("There are no similar paragraphs for this question.")
             return []
 
         return top_results
+
+    def retrieve_batch(self, questions, top_k=None, with_vectors=False):
+        """
+        Retrieve similar contexts for many questions with one encode and one
+        batch search. With `with_vectors` each result also carries its
+        stored `vector`, so callers can score it without re-encoding.
+        """
+
+        if top_k is None:
+            top_k = rag_settings.TOP_K_RETRIEVAL
+
+        if not questions:
+            return []
+
+        started = time.perf_counter()
+        query_embeddings = self.embed_queries(questions)
+        telemetry.observe("retrieval.embed_seconds", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        responses = self.vector_db.search_batch(query_embeddings, limit=top_k, with_vectors=with_vectors)
+        telemetry.observe("retrieval.dense_seconds", time.perf_counter() - started)
+
+        fused = self.fuse_batch(
+            questions, query_embeddings, [response.points for response in responses], top_k
+        )
+        return [
+            self.select_contexts(points, fusion_scores, top_k, with_vectors=with_vectors)
+            for points, fusion_scores in fused
+        ]
+
+    def fuse(self, query, query_embedding, dense_points, limit):
+        """
+        Fuse dense hits with BM25 hits by reciprocal rank fusion.
+
+        Returns the fused points and their fusion scores by point ID. Hits
+        found only lexically are fetched from the vector store and given
+        their cosine similarity to the query, so `score` keeps the same
+        meaning for every point. Without a BM25 index the dense hits are
+        returned unchanged.
+        """
+        return self.fuse_batch([query], [query_embedding], [dense_points], limit)[0]
+
+    def fuse_batch(self, queries, query_embeddings, dense_results, limit):
+        """
+        fuse for many queries at once: the lexical-only hits of the whole
+        batch are fetched from the vector store in one request
+        """
+        if self.bm25_index is None:
+            return [(dense_points, None) for dense_points in dense_results]
+
+        # Pick up documents other processes ingested since the last refresh
+        self.bm25_index.refresh(self.vector_db)
+
+        started = time.perf_counter()
+        lexical = [self.bm25_index.search(self.normalize_query(query), limit=limit) for query in queries]
+        telemetry.observe("retrieval.bm25_seconds", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        rankings = []
+        # Lexical-only hits by their native IDs (integer IDs must not be sent as strings)
+        missing = {}
+        for dense_points, hits in zip(dense_results, lexical):
+            fusion_scores = reciprocal_rank_fusion([
+                [str(point.id) for point in dense_points],
+                [str(point_id) for point_id, _ in hits],
+            ])
+            ranked = list(fusion_scores)[:limit]
+            rankings.append((fusion_scores, ranked))
+
+            dense_ids = {str(point.id) for point in dense_points}
+            native_ids = {str(point_id): point_id for point_id, _ in hits}
+            for point_id in ranked:
+                if point_id not in dense_ids:
+                    missing[point_id] = native_ids[point_id]
+
+        records = {}
+        if missing:
+            for record in self.vector_db.retrieve(list(missing.values()), with_vectors=True):
+                records[str(record.id)] = record
+
+        fused = []
+        for query_embedding, dense_points, (fusion_scores, ranked) in zip(query_embeddings, dense_results, rankings):
+            points = {str(point.id): point for point in dense_points}
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            query_norm = np.linalg.norm(query_vector) or 1.0
+            for point_id in ranked:
+                record = records.get(point_id)
+                if point_id in points or record is None:
+                    continue
+                vector = np.asarray(record.vector, dtype=np.float32)
+                score = float(vector @ query_vector / ((np.linalg.norm(vector) or 1.0) * query_norm))
+                points[point_id] = SearchHit(point_id, score, record.payload, record.vector)
+
+            fused.append(([points[point_id] for point_id in ranked if point_id in points], fusion_scores))
+
+        telemetry.observe("retrieval.fusion_seconds", time.perf_counter() - started)
+        return fused
+
+    def select_contexts(self, points, fusion_scores, top_k, with_vectors=False):
+        """
+        Apply the similarity threshold to ranked points and keep the first
+        top_k distinct contexts. The same text can be stored under several
+        point IDs (e.g. ingested twice with different metadata), so results
+        are deduplicated by the text hash in their slim payload, keeping the
+        best ranked one; context text is only fetched when a result is read
+        """
+        results = []
+        seen = set()
+        for result in points:
+            if len(results) == top_k:
+                break
+
+            score = result.score
+            
+            if score < self.similarity_threshold:
+                continue
+
+            # Points written before text hashes were stored only dedupe by ID
+            digest = (result.payload or {}).get("text_hash") or str(result.id)
+            if digest in seen:
+                continue
+            seen.add(digest)
+
+            # Chunk position is part of the slim payload, so merging needs no text lookups
+            chunk_fields = {
+                key: result.payload[key]
+                for key in ("parent_id", "chunk_index")
+                if result.payload and key in result.payload
+            }
+            entry = RetrievedContext(str(result.id), score, self.document_loader(result), **chunk_fields)
+            if fusion_scores is not None:
+                entry["fusion_score"] = fusion_scores[str(result.id)]
+            if with_vectors:
+                entry["vector"] = result.vector
+
+            results.append(entry)
+
+        if rag_settings.MERGE_ADJACENT_CHUNKS:
+            results = merge_adjacent_chunks(results)
+        return results
+
+    def load_contexts(self, results):
+        """Load the text of all results not loaded yet with one document read"""
+        pending = [result for result in results if "payload" not in result]
+        if pending:
+            documents = self.vector_db.fetch_documents([result["id"] for result in pending])
+            for result in pending:
+                result.load(documents.get(result["id"]))
+        return results
+
+    async def aload_contexts(self, results):
+        """Async variant of load_contexts; reads run on the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.load_contexts, results)
+
+    def document_loader(self, point):
+        """Loader for a point's full payload: the one returned by search, or the document store"""
+        payload = point.payload
+        if payload and ("context" in payload or "text" in payload):
+            return lambda _: payload
+        return self.vector_db.fetch_document
@@ -0,0 +1,42 @@
+class RetrievedContext(dict):
+    """
+    A retrieval result whose text is loaded on first access.
+
+    Search only returns point IDs and scores; `context`, `answer` and
+    `payload` are fetched through `loader(point_id)` the first time any of
+    them is read, so contexts that are never used are never fetched.
+    """
+
+    LAZY_KEYS = ("context", "answer", "payload")
+
+    def __init__(self, point_id, score, loader, **fields):
+        super().__init__(id=point_id, score=score, **fields)
+        self._loader = loader
+
+    def __missing__(self, key):
+        if key not in self.LAZY_KEYS:
+            raise KeyError(key)
+        self.load()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key in self or key in self.LAZY_KEYS:
+            return self[key]
+        return default
+
+    def load(self, payload=None):
+        """
+        Fetch the payload now, unless it is passed in; also materializes the
+        result for serialization
+        """
+        if "payload" not in self:
+            if payload is None:
+                payload = self._loader(self["id"]) or {}
+            # The first QA pair stands in for the context's answer
+            qas = payload.get("qas") or [{}]
+            self.update(
+                context=payload.get("context") or payload.get("text", ""),
+                answer=qas[0].get("answer_text", ""),
+                payload=payload
+            )
+        return self
@@ -0,0 +1,78 @@
+import bisect
+import threading
+from collections import deque
+
+
+class Histogram:
+    """
+    Thread-safe histogram: running count/sum, optional cumulative bucket
+    counts, and percentiles over a sliding window of recent values.
+    """
+
+    def __init__(self, buckets=None, window=2048):
+        self.buckets = sorted(buckets) if buckets else None
+        self._bucket_counts = [0] * (len(self.buckets) + 1) if self.buckets else None
+        self._values = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._values.append(value)
+            if self.buckets:
+                self._bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            values = sorted(self._values)
+            result = {
+                "count": self.count,
+                "sum": self.total,
+                "mean": self.total / self.count if self.count else 0.0,
+            }
+            if values:
+                result.update({
+                    "min": values[0],
+                    "max": values[-1],
+                    "p50": _percentile(values, 0.50),
+                    "p90": _percentile(values, 0.90),
+                    "p99": _percentile(values, 0.99),
+                })
+            if self.buckets:
+                labels = [f"le_{b}" for b in self.buckets] + ["inf"]
+                result["buckets"] = dict(zip(labels, self._bucket_counts))
+            return result
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+class Telemetry:
+    """Process-wide collection of named histograms"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, buckets=None):
+        """Return the named histogram, creating it on first use"""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(buckets=buckets)
+            return self._histograms[name]
+
+    def observe(self, name, value):
+        self.histogram(name).observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: h.snapshot() for name, h in histograms.items()}
+
+
+telemetry = Telemetry()
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import numpy as np
+from config.settings_rag import rag_settings
+
+# Fixed namespace so the same content always maps to the same point ID
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2d3e-8a4b-5c6d-9e7f-0a1b2c3d4e5f")
+
+# Minimal stand-ins for Qdrant's ScoredPoint / QueryResponse
+SearchHit = namedtuple("SearchHit", ["id", "score", "payload", "vector"])
+SearchResponse = namedtuple("SearchResponse", ["points"])
+
+# QA fields kept in a context's payload, per split
+QA_FIELDS = {
+    "train": ["id", "question", "answer_text"],
+    "val": ["question"],
+}
+
+
+def content_hash(*parts):
+    """Stable hash over the given content fields"""
+    joined = "\x1f".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def text_hash(text):
+    """Hash of a context's text, stored in the payload to spot the same text under other IDs"""
+    return content_hash(text.strip())
+
+
+def point_id_for(digest):
+    """Deterministic point ID (UUID) for a content hash"""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, digest))
+
+
+def native_point_id(point_id):
+    """
+    Point ID in the type Qdrant expects: IDs travel as strings through
+    payload lookups and rank fusion, but unsigned-integer IDs (written by
+    the original ingest endpoint) must be sent back as integers
+    """
+    if isinstance(point_id, str) and point_id.isdigit():
+        return int(point_id)
+    return point_id
+
+
+def to_numpy(embeddings):
+    """Convert a tensor or array of embeddings to a float32 NumPy array in one go"""
+    if hasattr(embeddings, "detach"):
+        embeddings = embeddings.detach().cpu().numpy()
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+class BaseVectorStore(ABC):
+    """
+    Interface shared by the vector store backends.
+
+    Backends implement collection management, upsert/delete, search and
+    info; loading the ARCD contexts is built on top of them here. Each
+    unique context is stored once, with its QA pairs in the payload.
+    Search results expose `.points`, each with `id`, `score`, `payload`
+    and `vector`, like Qdrant's QueryResponse.
+    """
+
+    collection_name = None
+
+    @abstractmethod
+    def ensure_collection(self, vector_size, rebuild=False):
+        """Create the collection if missing; only wipe it when rebuild is requested"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert(self, ids, embeddings, payloads):
+        """Insert or replace a small number of points synchronously"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def bulk_upsert(self, ids, embeddings, payloads):
+        """Insert or replace many points, reporting throughput"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_points(self, ids):
+        """Delete points by ID"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def existing_point_ids(self, splits):
+        """IDs of all points belonging to the given splits"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def retrieve(self, ids, with_vectors=False):
+        """Points (with payloads) for the given IDs"""
+        raise NotImplementedError
+
+    def fetch_document(self, point_id):
+        """Full payload of one point"""
+        points = self.retrieve([point_id])
+        return points[0].payload if points else None
+
+    def fetch_documents(self, ids):
+        """Full payloads of many points, as {id: payload}"""
+        return {
+            str(point.id): point.payload
+            for point in self.retrieve(ids)
+        }
+
+    def missing_documents(self, ids):
+        """
+        IDs among the given points whose full payload is not stored locally.
+        Stores that keep payloads next to the vectors never miss any.
+        """
+        return set()
+
+    def restore_documents(self, ids, payloads):
+        """Store full payloads for points whose vectors already exist"""
+
+    @abstractmethod
+    def iter_points(self):
+        """Yield (id, payload) for every point in the collection"""
+        raise NotImplementedError
+
+    def iter_points_since(self, timestamp):
+        """Yield (id, payload) for ingested points with `ingested_at` after timestamp"""
+        for point_id, payload in self.iter_points():
+            if (payload.get("ingested_at") or 0) > timestamp:
+                yield point_id, payload
+
+    @abstractmethod
+    def count(self):
+        """Number of points in the collection"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, query_vector, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False, exact=False):
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_batch(self, query_vectors, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False):
+        raise NotImplementedError
+
+    async def asearch(self, query_vector, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False):
+        """Async variant of search; runs the sync search on the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.search(query_vector, limit=limit, with_vectors=with_vectors)
+        )
+
+    @abstractmethod
+    def get_collection_info(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def group_contexts(samples, split):
+        """
+        One row per unique context of a split, with its QA pairs collected
+        in a `qas` list and a deterministic `point_id` derived from the
+        context and its QA pairs
+        """
+        qa_fields = QA_FIELDS[split]
+        records = samples.reindex(columns=["context", "title", *qa_fields], fill_value="")
+        if len(records) == 0:
+            return records[["context", "title"]].assign(qas=[], point_id=[])
+
+        grouped = records.groupby("context", sort=False)
+
+        contexts = grouped["title"].first().to_frame()
+        contexts["qas"] = grouped[qa_fields].apply(lambda qas: qas.to_dict("records"))
+        contexts = contexts.reset_index()
+
+        contexts["point_id"] = [
+            point_id_for(content_hash(
+                split, context, title, json.dumps(qas, ensure_ascii=False, sort_keys=True)
+            ))
+            for context, title, qas in zip(contexts["context"], contexts["title"], contexts["qas"])
+        ]
+        return contexts
+
+    @staticmethod
+    def context_payloads(contexts, split):
+        """Full payloads of grouped contexts (see group_contexts) of one split"""
+        return (
+            contexts[["context", "title", "qas"]]
+            .assign(split=split, text_hash=[text_hash(c) for c in contexts["context"]])
+            .to_dict("records")
+        )
+
+    def insert_contexts(self, contexts, embeddings, split):
+        """Insert grouped contexts (see group_contexts) of one split"""
+        if len(contexts) == 0:
+            return None, 0
+
+        payloads = self.context_payloads(contexts, split)
+
+        operation_info = self.bulk_upsert(
+            contexts["point_id"].tolist(), embeddings, payloads
+        )
+
+        return operation_info, len(payloads)
+
+    def insert_all_samples(self, train_contexts, train_embeddings,
+                           val_contexts, val_embeddings):
+        """Insert both training and validation contexts"""
+
+        train_operation, train_count = self.insert_contexts(
+            train_contexts, train_embeddings, "train"
+        )
+
+        val_operation, val_count = self.insert_contexts(
+            val_contexts, val_embeddings, "val"
+        )
+
+        return {
+            "train": {"operation": train_operation, "count": train_count},
+            "val": {"operation": val_operation, "count": val_count},
+            "total": train_count + val_count
+        }
@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class DocumentStore:
+    """
+    Local SQLite store of point payloads keyed by point ID.
+
+    Holds the text and metadata that used to live in Qdrant payloads, so
+    the vector store only keeps what it filters on and searches return
+    IDs and scores.
+    """
+
+    # SQLite's default limit on bound parameters per statement is 999
+    CHUNK_SIZE = 900
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, payload TEXT NOT NULL)"
+            )
+
+    def put_many(self, ids, payloads):
+        """Insert or replace payloads"""
+        rows = [
+            (str(point_id), json.dumps(payload, ensure_ascii=False))
+            for point_id, payload in zip(ids, payloads)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, payload) VALUES (?, ?)", rows
+            )
+
+    def get(self, point_id):
+        """Payload for one point ID, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM documents WHERE id = ?", (str(point_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, ids):
+        """Payloads for the given point IDs, as {id: payload}"""
+        ids = [str(point_id) for point_id in ids]
+        documents = {}
+        with self._lock:
+            for start in range(0, len(ids), self.CHUNK_SIZE):
+                chunk = ids[start:start + self.CHUNK_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT id, payload FROM documents WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                documents.update((point_id, json.loads(payload)) for point_id, payload in rows)
+        return documents
+
+    def existing(self, ids):
+        """The subset of the given point IDs that have a stored payload"""
+        ids = [str(point_id) for point_id in ids]
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), self.CHUNK_SIZE):
+                chunk = ids[start:start + self.CHUNK_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                found.update(point_id for point_id, in rows)
+        return found
+
+    def delete_many(self, ids):
+        ids = [(str(point_id),) for point_id in ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", ids)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents")
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
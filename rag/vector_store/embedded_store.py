@@ -0,0 +1,425 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+from config.settings_rag import rag_settings
+from rag.vector_store.base import BaseVectorStore, SearchHit, SearchResponse, to_numpy
+
+
+def normalize_rows(vectors):
+    """L2-normalise each row; zero rows are left as they are"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddedVectorStore(BaseVectorStore):
+    """
+    In-process vector store for small deployments, tests and evaluation.
+
+    Vectors are L2-normalised on insert and kept in a memory-mapped
+    float32 file that grows in chunks; queries are normalised too, so
+    cosine similarity (the same score Qdrant reports) is a single
+    matrix-vector product. Payloads live in an append-only JSONL sidecar
+    that is replayed on open. Search is exact by default; with
+    index="ivf" rows are assigned to k-means centroids and only the
+    `nprobe` closest lists are scanned. Deleted rows are skipped until
+    `compact` rewrites the collection without them, which happens
+    automatically once they make up a quarter of the rows.
+
+    Single-process only: the memmap and the JSONL log are written without
+    any cross-process locking, so two processes opening the same
+    collection will corrupt it. Multi-worker deployments should use the
+    Qdrant backend.
+    """
+
+    GROWTH = 4096
+
+    def __init__(self, collection_name=None, path=None,
+                 index=rag_settings.EMBEDDED_INDEX,
+                 nlist=rag_settings.EMBEDDED_IVF_NLIST,
+                 nprobe=rag_settings.EMBEDDED_IVF_NPROBE):
+        self.collection_name = collection_name or rag_settings.COLLECTION_NAME
+        self.path = os.path.join(path or rag_settings.EMBEDDED_STORE_DIR, self.collection_name)
+        self.index = index
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.initialized = False
+
+        self._lock = threading.RLock()
+        self._reset_state()
+        if os.path.exists(self._meta_path):
+            self._open()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _payloads_path(self):
+        return os.path.join(self.path, "payloads.jsonl")
+
+    def _reset_state(self):
+        self.dim = None
+        self._vectors = None
+        self._capacity = 0
+        self._size = 0
+        self._ids = []
+        self._payloads = []
+        self._rows = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._centroids = None
+        self._assignments = None
+        self._trained_size = 0
+
+    # Storage
+
+    def _open(self):
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.dim = meta["dim"]
+        self._capacity = meta["capacity"]
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+",
+            shape=(self._capacity, self.dim)
+        )
+        self._live = np.zeros(self._capacity, dtype=bool)
+
+        # Replay the payload log; later records win
+        if os.path.exists(self._payloads_path):
+            with open(self._payloads_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+        self.initialized = True
+
+    def _apply(self, record):
+        row = record["row"]
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._payloads.append(None)
+        self._size = max(self._size, row + 1)
+
+        if record.get("deleted"):
+            self._rows.pop(self._ids[row], None)
+            self._live[row] = False
+            self._payloads[row] = None
+            return
+
+        self._ids[row] = record["id"]
+        self._payloads[row] = record["payload"]
+        self._rows[record["id"]] = row
+        self._live[row] = True
+
+    def _write_meta(self):
+        with open(self._meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "capacity": self._capacity}, f)
+        os.replace(self._meta_path + ".tmp", self._meta_path)
+
+    def _grow(self, needed):
+        """Enlarge the memory-mapped vector file to hold at least `needed` rows"""
+        if needed <= self._capacity:
+            return
+
+        capacity = max(needed, self._capacity * 2, self.GROWTH)
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+",
+            shape=(capacity, self.dim)
+        )
+        self._live = np.concatenate([self._live, np.zeros(capacity - self._capacity, dtype=bool)])
+        if self._assignments is not None:
+            self._assignments = np.concatenate(
+                [self._assignments, np.full(capacity - self._capacity, -1, dtype=np.int32)]
+            )
+        self._capacity = capacity
+        self._write_meta()
+
+    # Collection
+
+    def create_collection(self, vector_size):
+        """Create an empty collection, dropping any existing one"""
+        with self._lock:
+            self._vectors = None
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+
+            self._reset_state()
+            self.dim = vector_size
+            self._grow(self.GROWTH)
+            open(self._payloads_path, "w").close()
+            self.initialized = True
+
+    def ensure_collection(self, vector_size, rebuild=False):
+        """Create the collection if missing; only wipe it when rebuild is requested"""
+        with self._lock:
+            if rebuild or self.dim != vector_size:
+                self.create_collection(vector_size)
+                return True
+
+            self.initialized = True
+            return False
+
+    # Points
+
+    def upsert(self, ids, embeddings, payloads):
+        """Insert or replace points; vectors are normalised before they are stored"""
+        vectors = normalize_rows(to_numpy(embeddings).reshape(len(ids), -1))
+
+        with self._lock:
+            new_ids = [i for i in dict.fromkeys(map(str, ids)) if i not in self._rows]
+            self._grow(self._size + len(new_ids))
+
+            records = []
+            for point_id, vector, payload in zip(ids, vectors, payloads):
+                point_id = str(point_id)
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = self._size
+                self._vectors[row] = vector
+                if self._assignments is not None:
+                    self._assignments[row] = self._nearest_centroids(vector[None, :], 1)[0, 0]
+
+                record = {"row": row, "id": point_id, "payload": payload}
+                self._apply(record)
+                records.append(record)
+
+            self._vectors.flush()
+            self._append_log(records)
+
+        return {"count": len(ids)}
+
+    def bulk_upsert(self, ids, embeddings, payloads,
+                    batch_size=rag_settings.UPSERT_BATCH_SIZE, **_):
+        """Insert points in batches; no network, so batches run sequentially"""
+        vectors = to_numpy(embeddings)
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self.upsert(ids[start:end], vectors[start:end], payloads[start:end])
+        return {"count": len(ids)}
+
+    def delete_points(self, ids):
+        """Delete points by ID"""
+        if not ids:
+            return None
+
+        with self._lock:
+            records = []
+            for point_id in ids:
+                row = self._rows.get(str(point_id))
+                if row is None:
+                    continue
+                record = {"row": row, "deleted": True}
+                self._apply(record)
+                records.append(record)
+            self._append_log(records)
+
+            if self._size - len(self._rows) > self._size // 4:
+                self.compact()
+
+        return {"count": len(records)}
+
+    def compact(self):
+        """
+        Rewrite the collection without deleted rows, which otherwise stay
+        in the vector file and the IVF lists. The new files are built next
+        to the collection and swapped in by renaming directories; returns
+        the number of rows reclaimed.
+        """
+        with self._lock:
+            if not self.initialized or len(self._rows) == self._size:
+                return 0
+
+            live_rows = np.flatnonzero(self._live[:self._size])
+            capacity = max(len(live_rows), self.GROWTH)
+            staging = self.path + ".compact"
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+
+            vectors = np.memmap(
+                os.path.join(staging, "vectors.f32"), dtype=np.float32, mode="w+",
+                shape=(capacity, self.dim)
+            )
+            for start in range(0, len(live_rows), 8192):
+                rows = live_rows[start:start + 8192]
+                vectors[start:start + len(rows)] = self._vectors[rows]
+            vectors.flush()
+            del vectors
+
+            with open(os.path.join(staging, "payloads.jsonl"), "w", encoding="utf-8") as f:
+                for row, old_row in enumerate(live_rows):
+                    record = {"row": row, "id": self._ids[old_row], "payload": self._payloads[old_row]}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "capacity": capacity}, f)
+
+            self._vectors.flush()
+            self._vectors = None
+            retired = self.path + ".old"
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(self.path, retired)
+            os.replace(staging, self.path)
+            shutil.rmtree(retired, ignore_errors=True)
+
+            reclaimed = self._size - len(live_rows)
+            # Row numbers changed, so IVF centroids are retrained on the next search
+            self._reset_state()
+            self._open()
+            return reclaimed
+
+    def _append_log(self, records):
+        if not records:
+            return
+        with open(self._payloads_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+    def existing_point_ids(self, splits):
+        """IDs of all points belonging to the given splits"""
+        splits = set(splits)
+        with self._lock:
+            return {
+                point_id for point_id, row in self._rows.items()
+                if (self._payloads[row] or {}).get("split") in splits
+            }
+
+    def retrieve(self, ids, with_vectors=False):
+        """Points (with payloads) for the given IDs"""
+        with self._lock:
+            rows = [self._rows[str(i)] for i in ids if str(i) in self._rows]
+            return [self._hit(row, None, with_vectors) for row in rows]
+
+    def fetch_document(self, point_id):
+        """Full payload of one point"""
+        with self._lock:
+            row = self._rows.get(str(point_id))
+            return dict(self._payloads[row]) if row is not None else None
+
+    def fetch_documents(self, ids):
+        """Full payloads of many points, as {id: payload}"""
+        with self._lock:
+            return {
+                str(point_id): dict(self._payloads[self._rows[str(point_id)]])
+                for point_id in ids
+                if str(point_id) in self._rows
+            }
+
+    def iter_points(self):
+        """Yield (id, payload) for every point in the collection"""
+        with self._lock:
+            points = [(point_id, dict(self._payloads[row])) for point_id, row in self._rows.items()]
+        yield from points
+
+    def count(self):
+        with self._lock:
+            return len(self._rows)
+
+    # Search
+
+    def search(self, query_vector, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False, exact=False):
+        """Search for similar QA samples"""
+        return self.search_batch([query_vector], limit=limit, with_vectors=with_vectors, exact=exact)[0]
+
+    def search_batch(self, query_vectors, limit=rag_settings.TOP_K_RETRIEVAL,
+                     with_vectors=False, exact=False):
+        """Score all queries in one matrix product (or per IVF probe set)"""
+        queries = normalize_rows(np.atleast_2d(to_numpy(query_vectors)))
+
+        with self._lock:
+            if not self._rows:
+                return [SearchResponse(points=[]) for _ in queries]
+
+            vectors = self._vectors[:self._size]
+            if exact or self.index != "ivf" or self._size < self.nlist * 8:
+                scores = queries @ vectors.T
+                scores[:, ~self._live[:self._size]] = -np.inf
+                return [self._top(row_scores, None, limit, with_vectors) for row_scores in scores]
+
+            self._maybe_train()
+            probes = self._nearest_centroids(queries, self.nprobe)
+            responses = []
+            for query, probe in zip(queries, probes):
+                candidates = np.flatnonzero(
+                    np.isin(self._assignments[:self._size], probe) & self._live[:self._size]
+                )
+                responses.append(
+                    self._top(vectors[candidates] @ query, candidates, limit, with_vectors)
+                )
+            return responses
+
+    def _top(self, scores, rows, limit, with_vectors):
+        k = min(limit, len(scores))
+        if k == 0:
+            return SearchResponse(points=[])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return SearchResponse(points=[
+            self._hit(int(i if rows is None else rows[i]), float(scores[i]), with_vectors)
+            for i in top if np.isfinite(scores[i])
+        ])
+
+    def _hit(self, row, score, with_vectors):
+        return SearchHit(
+            id=self._ids[row],
+            score=score,
+            payload=dict(self._payloads[row]),
+            vector=self._vectors[row].tolist() if with_vectors else None
+        )
+
+    # IVF
+
+    def _maybe_train(self):
+        """(Re)train centroids when missing or the collection has doubled since training"""
+        if self._centroids is not None and self._size < 2 * self._trained_size:
+            return
+
+        live_rows = np.flatnonzero(self._live[:self._size])
+        rng = np.random.default_rng(0)
+        sample = rng.choice(live_rows, size=min(len(live_rows), self.nlist * 64), replace=False)
+        data = np.asarray(self._vectors[np.sort(sample)])
+
+        nlist = min(self.nlist, len(data))
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)]
+        for _ in range(10):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[assignments == c]
+                if len(members):
+                    mean = members.mean(axis=0)
+                    centroids[c] = mean / (np.linalg.norm(mean) or 1)
+
+        self._centroids = centroids
+        self._assignments = np.full(self._capacity, -1, dtype=np.int32)
+        for start in range(0, self._size, 8192):
+            end = min(start + 8192, self._size)
+            self._assignments[start:end] = self._nearest_centroids(self._vectors[start:end], 1)[:, 0]
+        self._trained_size = self._size
+
+    def _nearest_centroids(self, vectors, n):
+        scores = np.asarray(vectors) @ self._centroids.T
+        n = min(n, len(self._centroids))
+        return np.argpartition(-scores, n - 1, axis=1)[:, :n]
+
+    def get_collection_info(self):
+        """Collection name, status and point count"""
+        with self._lock:
+            if not self.initialized:
+                return {"name": self.collection_name, "status": "not found"}
+            return {
+                "name": self.collection_name,
+                "status": "exists",
+                "points": len(self._rows),
+                "index": self.index,
+            }
@@ -1,101 +1,372 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import (
+    VectorParams, VectorParamsDiff, Distance, Batch, PointIdsList,
+    Filter, FieldCondition, MatchAny, Range, PayloadSchemaType, QueryRequest,
+    HnswConfigDiff, SearchParams, QuantizationSearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, Disabled
+)
 from config.settings_rag import rag_settings
+from rag.vector_store.base import BaseVectorStore, native_point_id, to_numpy
+from rag.vector_store.document_store import DocumentStore
 
 
-class VectorDB:
-    def __init__(self):
+def default_index_profile():
+    """HNSW, quantization and storage settings from RAGSettings"""
+    return {
+        "m": rag_settings.QDRANT_HNSW_M,
+        "ef_construct": rag_settings.QDRANT_HNSW_EF_CONSTRUCT,
+        "ef": rag_settings.QDRANT_SEARCH_EF,
+        "quantization": rag_settings.QDRANT_QUANTIZATION,
+        "oversampling": rag_settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        "rescore": rag_settings.QDRANT_QUANTIZATION_RESCORE,
+        "on_disk": rag_settings.QDRANT_ON_DISK,
+    }
+
+
+def slim_payload(payload):
+    """Only the payload fields Qdrant filters on"""
+    return {
+        key: payload[key]
+        for key in rag_settings.QDRANT_PAYLOAD_FIELDS
+        if key in payload
+    }
+
+
+class VectorDB(BaseVectorStore):
+    """
+    Qdrant-backed vector store.
+
+    Points only carry the payload fields used for filtering; the full
+    payloads are kept in a local DocumentStore keyed by point ID, and
+    searches return IDs and scores only.
+    """
+
+    def __init__(self, collection_name=None, index_profile=None, document_store=None):
         self.client = QdrantClient(
             host=rag_settings.QDRANT_HOST,
             port=rag_settings.QDRANT_PORT
         )
-        self.collection_name = rag_settings.COLLECTION_NAME
+        self.collection_name = collection_name or rag_settings.COLLECTION_NAME
+        self.index_profile = {**default_index_profile(), **(index_profile or {})}
+        self.documents = document_store or DocumentStore(
+            os.path.join(rag_settings.DOCUMENT_STORE_DIR, f"{self.collection_name}.sqlite3")
+        )
         self.initialized = False
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        """Async Qdrant client, created on first use by the async query path"""
+        if self._async_client is None:
+            self._async_client = AsyncQdrantClient(
+                host=rag_settings.QDRANT_HOST,
+                port=rag_settings.QDRANT_PORT
+            )
+        return self._async_client
 
     def create_collection(self, vector_size):
-        """Create a new Qdrant collection"""
+        """Create a new Qdrant collection, dropping any existing one"""
         self.client.recreate_collection(
             collection_name=self.collection_name,
             vectors_config=VectorParams(
                 size=vector_size,
-                distance=Distance.COSINE
-            )
+                distance=Distance.COSINE,
+                on_disk=self.index_profile["on_disk"]
+            ),
+            hnsw_config=self.hnsw_config(),
+            quantization_config=self.quantization_config()
         )
+        # Lets other processes' BM25 indexes find newly ingested points cheaply
+        self.client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name="ingested_at",
+            field_schema=PayloadSchemaType.FLOAT
+        )
+        self.documents.clear()
+        self.initialized = True
+
+    def ensure_collection(self, vector_size, rebuild=False):
+        """Create the collection if missing; only wipe it when rebuild is requested"""
+        if rebuild or not self.client.collection_exists(self.collection_name):
+            self.create_collection(vector_size)
+            return True
+
+        self.sync_index_config()
         self.initialized = True
+        return False
+
+    def hnsw_config(self):
+        return HnswConfigDiff(
+            m=self.index_profile["m"],
+            ef_construct=self.index_profile["ef_construct"],
+            on_disk=self.index_profile["on_disk"]
+        )
 
-    def insert_train_samples(self, samples, embeddings):
-        """Insert training QA samples into the vector database"""
-        points = [
-            PointStruct(
-                id=i,
-                vector=embeddings[i].cpu().numpy().tolist(),
-                payload={
-                    "id": samples.iloc[i]["id"],
-                    "title": samples.iloc[i]["title"],
-                    "context": samples.iloc[i]["context"],
-                    "question": samples.iloc[i]["question"],
-                    "answer_text": samples.iloc[i].get("answer_text", ""),
-                    "split": "train"
-                }
+    def quantization_config(self):
+        """Scalar int8 or binary quantization, kept in RAM for fast scoring"""
+        quantization = self.index_profile["quantization"]
+        if quantization is None:
+            return None
+        if quantization == "int8":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=0.99, always_ram=True
+                )
             )
-            for i in range(len(samples))
-        ]
+        if quantization == "binary":
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True)
+            )
+        raise ValueError(f"Unsupported quantization: {quantization}")
 
-        operation_info = self.client.upsert(
-            collection_name=self.collection_name,
-            wait=True,
-            points=points
+    def search_params(self, exact=False):
+        """Search-time ef and quantization oversampling/rescoring"""
+        quantization = None
+        if self.index_profile["quantization"] is not None:
+            quantization = QuantizationSearchParams(
+                rescore=self.index_profile["rescore"],
+                oversampling=self.index_profile["oversampling"]
+            )
+        return SearchParams(
+            hnsw_ef=self.index_profile["ef"],
+            exact=exact,
+            quantization=quantization
         )
 
-        return operation_info, len(points)
-
-    def insert_validation_samples(self, samples, embeddings, start_id):
-        """Insert validation QA samples into the vector database"""
-        points = [
-            PointStruct(
-                id=start_id + i,
-                vector=embeddings[i].cpu().numpy().tolist(),
-                payload={
-                    "context": samples.iloc[i]["context"],
-                    "question": samples.iloc[i]["question"],
-                    "split": "val"
-                }
+    def sync_index_config(self):
+        """Apply changed HNSW/quantization/on-disk settings to an existing collection in place"""
+        config = self.client.get_collection(self.collection_name).config
+        current_quantization = config.quantization_config
+        wanted_quantization = self.quantization_config()
+        on_disk = bool(self.index_profile["on_disk"])
+
+        hnsw_changed = (
+            config.hnsw_config.m != self.index_profile["m"]
+            or config.hnsw_config.ef_construct != self.index_profile["ef_construct"]
+            or bool(config.hnsw_config.on_disk) != on_disk
+        )
+        quantization_changed = type(current_quantization) is not type(wanted_quantization)
+        # Unset means in memory; the collection has a single unnamed vector
+        vectors_changed = bool(config.params.vectors.on_disk) != on_disk
+
+        if hnsw_changed or quantization_changed or vectors_changed:
+            print("Index settings changed, updating collection configuration...")
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                hnsw_config=self.hnsw_config(),
+                # Qdrant drops quantization when asked for Disabled; None means "unchanged"
+                quantization_config=wanted_quantization or Disabled.DISABLED,
+                vectors_config={"": VectorParamsDiff(on_disk=on_disk)} if vectors_changed else None
             )
-            for i in range(len(samples))
-        ]
 
-        operation_info = self.client.upsert(
-            collection_name=self.collection_name,
-            wait=True,
-            points=points
+    def existing_point_ids(self, splits):
+        """IDs of all points in the collection belonging to the given splits"""
+        scroll_filter = Filter(
+            must=[FieldCondition(key="split", match=MatchAny(any=list(splits)))]
         )
 
-        return operation_info, len(points)
+        ids = set()
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            ids.update(str(point.id) for point in points)
+            if offset is None:
+                return ids
 
-    def insert_all_samples(self, train_samples, train_embeddings,
-                           val_samples, val_embeddings):
-        """Insert both training and validation QA samples"""
+    def delete_points(self, ids):
+        """Delete points by ID"""
+        if not ids:
+            return None
 
-        train_operation, train_count = self.insert_train_samples(
-            train_samples, train_embeddings
+        operation_info = self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=[native_point_id(i) for i in ids]),
+            wait=True
         )
+        self.documents.delete_many(ids)
+        return operation_info
 
-        val_operation, val_count = self.insert_validation_samples(
-            val_samples, val_embeddings, start_id=train_count
+    def upsert(self, ids, embeddings, payloads):
+        """Insert or replace a small number of points in one request"""
+        # Documents first, so a point is never searchable without its text
+        self.documents.put_many(ids, payloads)
+        return self.client.upsert(
+            collection_name=self.collection_name,
+            points=Batch(
+                ids=list(ids),
+                vectors=to_numpy(embeddings).tolist(),
+                payloads=[slim_payload(p) for p in payloads]
+            ),
+            wait=True
+        )
+
+    def retrieve(self, ids, with_vectors=False):
+        """Points (with payloads) for the given IDs"""
+        return self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=[native_point_id(i) for i in ids],
+            with_payload=True,
+            with_vectors=with_vectors
         )
 
+    def fetch_document(self, point_id):
+        """Full payload of one point from the document store"""
+        document = self.documents.get(point_id)
+        if document is None:
+            # Points written before payloads moved to the document store
+            document = super().fetch_document(point_id)
+            if document is not None and "context" not in document and "text" not in document:
+                print(f"Point {point_id} has no text: it is missing from the document store "
+                      f"at {self.documents.path}")
+        return document
+
+    def fetch_documents(self, ids):
+        """Full payloads of many points: one document store read, one Qdrant call for the rest"""
+        documents = self.documents.get_many(ids)
+        missing = [point_id for point_id in ids if str(point_id) not in documents]
+        if missing:
+            documents.update(super().fetch_documents(missing))
+        return documents
+
+    def missing_documents(self, ids):
+        """IDs among the given points that have no payload in the local document store"""
+        ids = {str(point_id) for point_id in ids}
+        return ids - self.documents.existing(ids)
+
+    def restore_documents(self, ids, payloads):
+        """Re-create local documents for points that already exist in Qdrant"""
+        self.documents.put_many(ids, payloads)
+
+    def iter_points(self, scroll_filter=None):
+        """Yield (id, payload) for every point in the collection (matching the filter)"""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            documents = self.documents.get_many(point.id for point in points)
+            for point in points:
+                # IDs keep their native type (UUID string or integer)
+                yield point.id, documents.get(str(point.id)) or self.fetch_document(point.id) or {}
+            if offset is None:
+                return
+
+    def iter_points_since(self, timestamp):
+        """Yield (id, payload) for ingested points with `ingested_at` after timestamp"""
+        return self.iter_points(Filter(
+            must=[FieldCondition(key="ingested_at", range=Range(gt=timestamp))]
+        ))
+
+    def count(self):
+        return self.client.count(collection_name=self.collection_name, exact=True).count
+
+    def bulk_upsert(self, ids, embeddings, payloads,
+                    batch_size=rag_settings.UPSERT_BATCH_SIZE,
+                    parallel=rag_settings.UPSERT_PARALLEL,
+                    max_retries=rag_settings.UPSERT_MAX_RETRIES):
+        """Upload points in fixed-size batches with bounded concurrency and retries"""
+        vectors = to_numpy(embeddings)
+        total = len(ids)
+        start_time = time.perf_counter()
+
+        self.documents.put_many(ids, payloads)
+
+        def upload(start):
+            end = min(start + batch_size, total)
+            batch = Batch(
+                ids=list(ids[start:end]),
+                vectors=vectors[start:end].tolist(),
+                payloads=[slim_payload(p) for p in payloads[start:end]]
+            )
+            for attempt in range(max_retries + 1):
+                try:
+                    return self.client.upsert(
+                        collection_name=self.collection_name,
+                        points=batch,
+                        wait=True
+                    )
+                except Exception:
+                    if attempt == max_retries:
+                        raise
+                    time.sleep(0.5 * (2 ** attempt))
+
+        # Keep at most `parallel` batches in flight so large corpora are streamed
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            in_flight = set()
+            for start in range(0, total, batch_size):
+                if len(in_flight) >= parallel:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(executor.submit(upload, start))
+            for future in in_flight:
+                future.result()
+
+        elapsed = time.perf_counter() - start_time
+        throughput = total / elapsed if elapsed > 0 else float("inf")
+        print(f"Upserted {total} points in {elapsed:.2f}s "
+              f"({throughput:.0f} points/s, batch_size={batch_size}, parallel={parallel})")
+
         return {
-            "train": {"operation": train_operation, "count": train_count},
-            "val": {"operation": val_operation, "count": val_count},
-            "total": train_count + val_count
+            "count": total,
+            "batches": (total + batch_size - 1) // batch_size,
+            "seconds": elapsed,
+            "points_per_second": throughput,
         }
 
-    def search(self, query_vector, limit=rag_settings.TOP_K_RETRIEVAL):
-        """Search for similar QA samples"""
+    def search(self, query_vector, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False, exact=False):
+        """Search for similar contexts; returns IDs, scores and the slim payload only"""
         return self.client.query_points(
             collection_name=self.collection_name,
             query=query_vector,
-            limit=limit
+            limit=limit,
+            with_payload=list(rag_settings.QDRANT_PAYLOAD_FIELDS),
+            with_vectors=with_vectors,
+            search_params=self.search_params(exact=exact)
+        )
+
+    async def asearch(self, query_vector, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False):
+        """Async variant of search"""
+        return await self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            limit=limit,
+            with_payload=list(rag_settings.QDRANT_PAYLOAD_FIELDS),
+            with_vectors=with_vectors,
+            search_params=self.search_params()
+        )
+
+    def search_batch(self, query_vectors, limit=rag_settings.TOP_K_RETRIEVAL, with_vectors=False):
+        """Search for many query vectors in a single request"""
+        requests = [
+            QueryRequest(
+                query=to_numpy(vector).tolist(),
+                limit=limit,
+                with_payload=list(rag_settings.QDRANT_PAYLOAD_FIELDS),
+                with_vector=with_vectors,
+                params=self.search_params()
+            )
+            for vector in query_vectors
+        ]
+        return self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=requests
         )
 
     def get_collection_info(self):
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import google.generativeai as genai
+
+from rag.generation.gemini_client import (
+    AIMDLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    GeminiClient,
+    GeminiUnavailableError,
+    TokenBucket,
+)
+from rag.generation.gemini_generator import response_text
+
+
+class FakeGemini:
+    """
+    Local stand-in for the Gemini REST API. Each generateContent request
+    takes the next scripted (status, delay) step; the last step repeats.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, delay = fake.next_step()
+                time.sleep(delay)
+
+                if status == 200:
+                    body = {"candidates": [{
+                        "content": {"role": "model", "parts": [{"text": "ok"}]},
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }]}
+                else:
+                    body = {"error": {"code": status, "message": f"fake {status}"}}
+
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def next_step(self):
+        self.requests += 1
+        return self.script.pop(0) if len(self.script) > 1 else self.script[0]
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_client(fake, **kwargs):
+    genai.configure(api_key="test", transport="rest", client_options={"api_endpoint": fake.endpoint})
+    options = {
+        "rate_limiter": TokenBucket(rate=100, burst=100),
+        "concurrency": AIMDLimiter(initial=4, minimum=1, maximum=8, latency_target=5.0),
+        "breaker": CircuitBreaker(failure_threshold=5, reset_timeout=30),
+        "timeout": 10.0,
+        "max_retries": 3,
+        "base_delay": 0.01,
+        "max_delay": 0.05,
+    }
+    options.update(kwargs)
+    return GeminiClient(genai.GenerativeModel("fake-model"), **options)
+
+
+def test_retries_rate_limited_calls():
+    fake = FakeGemini([(429, 0), (429, 0), (200, 0)])
+    try:
+        client = make_client(fake)
+        response = client.generate_content("question")
+
+        assert response_text(response) == "ok"
+        assert fake.requests == 3
+        # Each 429 halves the concurrency limit
+        assert client.concurrency.limit < 4
+        assert client.breaker.state == CircuitBreaker.CLOSED
+        print(f"Recovered after {fake.requests} requests, stats: {client.stats()}")
+    finally:
+        fake.close()
+
+
+def test_breaker_fails_fast():
+    fake = FakeGemini([(503, 0)])
+    try:
+        client = make_client(fake, max_retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+
+        try:
+            client.generate_content("question")
+            raise AssertionError("expected GeminiUnavailableError")
+        except CircuitOpenError:
+            raise AssertionError("first call should reach the server")
+        except GeminiUnavailableError:
+            pass
+
+        seen = fake.requests
+        started = time.monotonic()
+        try:
+            client.generate_content("question")
+            raise AssertionError("expected CircuitOpenError")
+        except CircuitOpenError as e:
+            assert e.retry_after > 0
+
+        assert fake.requests == seen
+        assert time.monotonic() - started < 0.1
+        print(f"Circuit open after {seen} requests, stats: {client.stats()}")
+    finally:
+        fake.close()
+
+
+def test_deadline_bounds_slow_calls():
+    fake = FakeGemini([(200, 2.0)])
+    try:
+        client = make_client(fake, timeout=0.5, max_retries=0)
+
+        started = time.monotonic()
+        try:
+            client.generate_content("question")
+            raise AssertionError("expected GeminiUnavailableError")
+        except GeminiUnavailableError:
+            pass
+
+        elapsed = time.monotonic() - started
+        assert elapsed < 1.5
+        print(f"Gave up after {elapsed:.2f}s")
+    finally:
+        fake.close()
+
+
+class SlowModel:
+    """Model stub whose async calls block until released"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.entered = None
+
+    async def generate_content_async(self, contents, **kwargs):
+        self.entered.set()
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+
+def test_cancelled_trial_reopens_breaker():
+    async def run():
+        model = SlowModel(delay=5.0)
+        model.entered = asyncio.Event()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        client = GeminiClient(
+            model,
+            rate_limiter=TokenBucket(rate=100, burst=100),
+            concurrency=AIMDLimiter(initial=4, minimum=1, maximum=8, latency_target=5.0),
+            breaker=breaker,
+            timeout=10.0,
+        )
+
+        # The first call after the reset timeout is the half-open trial; cancel it mid-flight
+        await asyncio.sleep(0.06)
+        trial = asyncio.create_task(client.generate_content_async("question"))
+        await model.entered.wait()
+        trial.cancel()
+        try:
+            await trial
+            raise AssertionError("expected CancelledError")
+        except asyncio.CancelledError:
+            pass
+
+        stats = client.stats()
+        assert stats["in_flight"] == 0
+        assert stats["breaker"] == CircuitBreaker.OPEN
+
+        # After the next reset timeout a new trial gets through and closes the circuit
+        await asyncio.sleep(0.06)
+        model.delay = 0
+        assert await client.generate_content_async("question") == "ok"
+        assert client.stats()["breaker"] == CircuitBreaker.CLOSED
+        print(f"Recovered after a cancelled trial, stats: {client.stats()}")
+
+    asyncio.run(run())
+
+
+def test_token_bucket_spaces_calls():
+    bucket = TokenBucket(rate=10, burst=1)
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[0] == 0.0
+    assert all(abs(w - 0.1 * i) < 0.02 for i, w in enumerate(waits))
+    print(f"Reservation waits: {[round(w, 3) for w in waits]}")
+
+
+def test_aimd_limiter_adapts():
+    limiter = AIMDLimiter(initial=4, minimum=1, maximum=8, latency_target=1.0)
+
+    for _ in range(20):
+        assert limiter.acquire(timeout=0)
+        limiter.release(latency=0.1)
+    grown = limiter.limit
+
+    assert limiter.acquire(timeout=0)
+    limiter.release(latency=0.1, overloaded=True)
+
+    assert grown > 4
+    assert limiter.limit == grown * 0.5
+    print(f"Limit grew to {grown:.2f} and backed off to {limiter.limit:.2f}")
+
+
+def test_async_waiters_woken_on_release():
+    """Coroutines waiting for a slot are woken by release, also from another thread"""
+    limiter = AIMDLimiter(initial=1, minimum=1, maximum=1, latency_target=1.0)
+    assert limiter.try_acquire()
+
+    async def run():
+        # Nobody releases: the waiter times out and leaves no parked future behind
+        assert not await limiter.aacquire(timeout=0.05)
+        assert not limiter._waiters
+
+        waiter = asyncio.ensure_future(limiter.aacquire(timeout=2))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        threading.Thread(target=limiter.release).start()
+        assert await waiter
+        return time.monotonic() - started
+
+    woken_after = asyncio.run(run())
+    assert limiter.in_flight == 1
+    assert woken_after < 0.5
+    print(f"Async waiter woken {woken_after * 1000:.1f}ms after release")
+
+
+if __name__ == "__main__":
+    print("Running Gemini client tests...\n")
+    test_retries_rate_limited_calls()
+    test_breaker_fails_fast()
+    test_deadline_bounds_slow_calls()
+    test_cancelled_trial_reopens_breaker()
+    test_token_bucket_spaces_calls()
+    test_aimd_limiter_adapts()
+    test_async_waiters_woken_on_release()
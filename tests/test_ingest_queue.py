@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from rag.ingestion import DocumentIngestor
+from rag.jobs.ingest_queue import IngestJobQueue
+from rag.jobs.ingest_worker import IngestWorker
+from rag.registry import registry
+from config.settings_rag import rag_settings
+
+
+class FlakyIngestor:
+    """Stand-in for DocumentIngestor that fails the chosen call numbers"""
+
+    def __init__(self, fail_calls=()):
+        self.fail_calls = set(fail_calls)
+        self.calls = 0
+        self.ingested = []
+        # Chunking only: validation never touches the embedder or vector store
+        self.validate = DocumentIngestor(embedding_generator=object(), vector_db=object()).validate
+
+    def ingest_many(self, documents):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise ConnectionError("vector store unavailable")
+        self.ingested.extend(document["id"] for document in documents)
+        return [{"id": document["id"], "chunks": 1} for document in documents]
+
+
+@contextmanager
+def serve_ingestor(ingestor):
+    """Resolve `ingestor` from the registry inside the block, then restore the previous one"""
+    previous = registry.get("ingestor") if registry.is_loaded("ingestor") else None
+    registry.set("ingestor", ingestor)
+    try:
+        yield ingestor
+    finally:
+        if previous is None:
+            registry.reset("ingestor")
+        else:
+            registry.set("ingestor", previous)
+
+
+def make_queue():
+    return IngestJobQueue(os.path.join(tempfile.mkdtemp(), "ingest_jobs.db"))
+
+
+def make_records(count, invalid=()):
+    return [
+        "not json" if i in invalid else json.dumps({"text": f"وثيقة رقم {i}"})
+        for i in range(count)
+    ]
+
+
+def test_failed_batch_resumes_from_committed_offset():
+    """An infrastructure error mid-job keeps committed batches and retries the rest"""
+    queue = make_queue()
+    ingestor = FlakyIngestor(fail_calls={2})
+    with serve_ingestor(ingestor):
+        worker = IngestWorker(job_queue=queue, batch_size=4)
+
+        job_id = queue.create_job(make_records(10, invalid={1}))
+        job = queue.claim_next()
+        assert job["id"] == job_id
+
+        # Second batch fails: only the first one is committed
+        try:
+            worker.process(job)
+            raise AssertionError("expected the batch to fail")
+        except ConnectionError as e:
+            error = e
+
+        base_delay = rag_settings.INGEST_RETRY_BASE_DELAY
+        rag_settings.INGEST_RETRY_BASE_DELAY = 0
+        try:
+            worker.retry_or_fail(job, error)
+        finally:
+            rag_settings.INGEST_RETRY_BASE_DELAY = base_delay
+
+        status = queue.status(job_id)
+        assert status["status"] == "queued"
+        assert status["attempts"] == 1
+        assert status["processed"] == 4
+        assert status["failed"] == 1
+
+        job = queue.claim_next()
+        assert job["id"] == job_id
+        worker.process(job)
+        queue.complete(job_id)
+
+        status = queue.status(job_id)
+        assert status["status"] == "completed"
+        assert status["processed"] == 10
+        assert status["failed"] == 1
+        assert status["chunks"] == 9
+        assert status["errors"][0]["line"] == 2
+
+        # Each valid record is ingested exactly once
+        expected = [f"{job_id}:{line}" for line in range(10) if line != 1]
+        assert sorted(ingestor.ingested) == sorted(expected)
+        print(f"Resumed after a failed batch, status: {status}")
+
+
+def test_stale_job_is_reclaimed():
+    """A job whose worker stopped heartbeating is claimed again and resumed"""
+    queue = make_queue()
+    ingestor = FlakyIngestor()
+    with serve_ingestor(ingestor):
+
+        job_id = queue.create_job(make_records(6))
+        job = queue.claim_next()
+        rows = next(queue.pending_records(job_id, 4))
+        queue.record_progress(job_id, processed=len(rows), failed=0, chunks=len(rows), errors=[])
+
+        # The worker died: a fresh heartbeat keeps the job, a stale one releases it
+        assert queue.claim_next() is None
+        time.sleep(0.05)
+        job = queue.claim_next(stale_after=0.01)
+        assert job["id"] == job_id
+
+        IngestWorker(job_queue=queue, batch_size=4).process(job)
+        assert ingestor.ingested == [f"{job_id}:4", f"{job_id}:5"]
+        assert queue.get(job_id)["processed"] == 6
+        print(f"Reclaimed job resumed at record 4, ingested: {ingestor.ingested}")
+
+
+def test_record_without_arabic_text_is_reported():
+    """Text that normalizes to nothing is a per-record error, not a silent 0-chunk success"""
+    queue = make_queue()
+    ingestor = FlakyIngestor()
+    with serve_ingestor(ingestor):
+
+        job_id = queue.create_job([
+            json.dumps({"text": "وثيقة عربية"}),
+            json.dumps({"text": "Latin text only"}),
+        ])
+        job = queue.claim_next()
+        IngestWorker(job_queue=queue, batch_size=4).process(job)
+
+        status = queue.status(job_id)
+        assert ingestor.ingested == [f"{job_id}:0"]
+        assert status["failed"] == 1
+        assert status["errors"][0]["line"] == 2
+        print(f"Rejected record: {status['errors'][0]['error']}")
+
+
+def test_empty_upload_fails_job():
+    queue = make_queue()
+    job_id = queue.create_job(["", "   "])
+
+    status = queue.status(job_id)
+    assert status["status"] == "failed"
+    assert status["total"] == 0
+    assert queue.claim_next() is None
+    print(f"Empty upload: {status['error']}")
+
+
+if __name__ == "__main__":
+    print("Running ingestion queue tests...\n")
+    test_failed_batch_resumes_from_committed_offset()
+    test_stale_job_is_reclaimed()
+    test_record_without_arabic_text_is_reported()
+    test_empty_upload_fails_job()
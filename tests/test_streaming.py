@@ -0,0 +1,49 @@
+from rag.generation.prompt import truncate_answer
+from rag.generation.streaming import StreamTruncator
+
+
+def stream(text, size):
+    """Feed text to a StreamTruncator in chunks of size; returns it and the emitted text"""
+    truncator = StreamTruncator()
+    emitted = ""
+    for start in range(0, len(text), size):
+        emitted += truncator.feed(text[start:start + size])
+        if truncator.done:
+            break
+    return truncator, emitted
+
+
+def test_stream_matches_batch_truncation():
+    """Streamed answers end where truncate_answer ends the full answer"""
+    answers = [
+        " ولد في ألمانيا، عام 1879. ثم انتقل",
+        "ولد في ألمانيا، عام 1879",
+        "هل ولد في ألمانيا؟ نعم، عام 1879! ثم",
+        "a? b، c",
+        "بدون علامات توقف",
+    ]
+    for answer in answers:
+        expected = truncate_answer(answer.strip())
+        for size in (1, 3, 7, len(answer)):
+            truncator, emitted = stream(answer, size)
+            assert emitted.strip() == expected, (answer, size, emitted)
+            assert truncator.answer == expected
+    print("Streamed and batch truncation agree")
+
+
+def test_stream_holds_text_after_lower_priority_stop():
+    truncator = StreamTruncator()
+    assert truncator.feed("ولد في ألمانيا، عام") == "ولد في ألمانيا،"
+    assert not truncator.done
+
+    # A later '.' releases the held-back text and ends the stream
+    assert truncator.feed(" 1879. ثم") == " عام 1879."
+    assert truncator.done
+    assert truncator.feed(" انتقل") == ""
+    print(f"Final answer: {truncator.answer}")
+
+
+if __name__ == "__main__":
+    print("Running streaming tests...\n")
+    test_stream_matches_batch_truncation()
+    test_stream_holds_text_after_lower_priority_stop()